@@ -37,15 +37,23 @@ class GithubOrgClient:
         """Memoize repos payload"""
         return get_json(self._public_repos_url)
 
+    @memoize
+    def _license_index(self) -> Dict[str, List[str]]:
+        """Memoize repo names grouped by license key"""
+        index: Dict[str, List[str]] = {}
+        for repo in self.repos_payload:
+            try:
+                key = access_nested_map(repo, ("license", "key"))
+            except KeyError:
+                continue
+            index.setdefault(key, []).append(repo["name"])
+        return index
+
     def public_repos(self, license: str = None) -> List[str]:
         """Public repos"""
-        json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
-
-        return public_repos
+        if license is not None:
+            return list(self._license_index.get(license, ()))
+        return [repo["name"] for repo in self.repos_payload]
 
     @staticmethod
     def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
@@ -4,12 +4,50 @@ Test cases for client module.
 """
 
 import unittest
+from types import MappingProxyType
 from unittest.mock import patch
 from parameterized import parameterized, parameterized_class
 from client import GithubOrgClient
 from fixtures import TEST_PAYLOAD
 
 
+class _MockResponse:
+    """Minimal stand-in for requests.Response exposing only json()."""
+    __slots__ = ("json_data",)
+
+    def __init__(self, json_data):
+        self.json_data = json_data
+
+    def json(self):
+        return self.json_data
+
+
+# Fixtures are loaded once at import; responses are prebuilt per URL.
+_PAYLOAD = TEST_PAYLOAD[0]
+_RESPONSES = {
+    "https://api.github.com/orgs/google": _MockResponse(_PAYLOAD[0]),
+    _PAYLOAD[0]["repos_url"]: _MockResponse(_PAYLOAD[1]),
+}
+_EMPTY_RESPONSE = _MockResponse({})
+
+# Shared read-only payloads; MappingProxyType keeps rows from mutating them.
+_EXPECTED_ORGS = {
+    name: MappingProxyType({"login": name, "id": 12345})
+    for name in ("google", "abc")
+}
+_REPOS_URL = "https://api.github.com/orgs/test/repos"
+_KNOWN_ORG_PAYLOAD = MappingProxyType({
+    "repos_url": _REPOS_URL,
+    "login": "test",
+    "id": 12345
+})
+_REPO_PAYLOAD = (
+    MappingProxyType({"name": "repo1", "license": {"key": "mit"}}),
+    MappingProxyType({"name": "repo2", "license": {"key": "apache-2.0"}}),
+    MappingProxyType({"name": "repo3", "license": None}),
+)
+
+
 class TestGithubOrgClient(unittest.TestCase):
     """Test class for GithubOrgClient."""
 
@@ -21,7 +59,7 @@ class TestGithubOrgClient(unittest.TestCase):
     def test_org(self, org_name, mock_get_json):
         """Test that GithubOrgClient.org returns the correct value."""
         # Setup expected return value
-        expected_result = {"login": org_name, "id": 12345}
+        expected_result = _EXPECTED_ORGS[org_name]
         mock_get_json.return_value = expected_result
 
         # Create client instance
@@ -39,12 +77,8 @@ class TestGithubOrgClient(unittest.TestCase):
 
     def test_public_repos_url(self):
         """Test that GithubOrgClient._public_repos_url returns the correct URL."""
-        # Define known payload with repos_url
-        known_payload = {
-            "repos_url": "https://api.github.com/orgs/test/repos",
-            "login": "test",
-            "id": 12345
-        }
+        # Known payload with repos_url
+        known_payload = _KNOWN_ORG_PAYLOAD
 
         # Use patch as context manager to mock the org property
         with patch.object(GithubOrgClient, 'org',
@@ -58,35 +92,6 @@ class TestGithubOrgClient(unittest.TestCase):
             # Assert the result matches the repos_url from the mocked payload
             self.assertEqual(result, known_payload["repos_url"])
 
-    @patch('client.get_json')
-    def test_public_repos(self, mock_get_json):
-        """Test that GithubOrgClient.public_repos returns the correct list of repos."""
-        # Define test payload with repo data
-        test_payload = [
-            {"name": "repo1", "license": {"key": "mit"}},
-            {"name": "repo2", "license": {"key": "apache-2.0"}},
-            {"name": "repo3", "license": None}
-        ]
-        mock_get_json.return_value = test_payload
-
-        # Mock _public_repos_url property
-        with patch.object(GithubOrgClient, '_public_repos_url',
-                          new_callable=lambda: property(
-                              lambda self: "https://api.github.com/orgs/test/repos")):
-            client = GithubOrgClient("test")
-
-            # Call public_repos method
-            result = client.public_repos()
-
-            # Expected list of repo names
-            expected_repos = ["repo1", "repo2", "repo3"]
-
-            # Assert correct list of repos is returned
-            self.assertEqual(result, expected_repos)
-
-            # Assert get_json was called once
-            mock_get_json.assert_called_once()
-
     @parameterized.expand([
         ({"license": {"key": "my_license"}}, "my_license", True),
         ({"license": {"key": "other_license"}}, "my_license", False),
@@ -97,12 +102,56 @@ class TestGithubOrgClient(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestGithubOrgClientPublicRepos(unittest.TestCase):
+    """Unit tests for GithubOrgClient.public_repos.
+
+    Kept apart from TestGithubOrgClient because the class fixtures patch
+    _public_repos_url, which test_public_repos_url needs unpatched.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Patch get_json and _public_repos_url once for every row."""
+        cls.get_json_patcher = patch('client.get_json',
+                                     return_value=_REPO_PAYLOAD)
+        cls.mock_get_json = cls.get_json_patcher.start()
+        cls.url_patcher = patch.object(GithubOrgClient, '_public_repos_url',
+                                       new_callable=lambda: property(
+                                           lambda self: _REPOS_URL))
+        cls.url_patcher.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the patchers started in setUpClass."""
+        cls.url_patcher.stop()
+        cls.get_json_patcher.stop()
+
+    def setUp(self):
+        """Forget calls made by the previous row."""
+        self.mock_get_json.reset_mock()
+
+    @parameterized.expand([
+        (None, ["repo1", "repo2", "repo3"]),
+        ("mit", ["repo1"]),
+        ("apache-2.0", ["repo2"]),
+    ])
+    def test_public_repos(self, license, expected_repos):
+        """Test that GithubOrgClient.public_repos returns the correct list of repos."""
+        client = GithubOrgClient("test")
+
+        # Assert correct list of repos is returned
+        self.assertEqual(client.public_repos(license), expected_repos)
+
+        # Assert get_json was called once with the mocked URL
+        self.mock_get_json.assert_called_once_with(_REPOS_URL)
+
+
 @parameterized_class([
     {
-        "org_payload": TEST_PAYLOAD[0][0],
-        "repos_payload": TEST_PAYLOAD[0][1],
-        "expected_repos": TEST_PAYLOAD[0][2],
-        "apache2_repos": TEST_PAYLOAD[0][3]
+        "org_payload": _PAYLOAD[0],
+        "repos_payload": _PAYLOAD[1],
+        "expected_repos": _PAYLOAD[2],
+        "apache2_repos": _PAYLOAD[3]
     }
 ])
 
@@ -114,18 +163,7 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         """Set up class method to start patcher."""
         def side_effect(url):
             """Side effect function for mocked requests.get."""
-            class MockResponse:
-                def __init__(self, json_data):
-                    self.json_data = json_data
-
-                def json(self):
-                    return self.json_data
-
-            if url == "https://api.github.com/orgs/google":
-                return MockResponse(cls.org_payload)
-            elif url == cls.org_payload["repos_url"]:
-                return MockResponse(cls.repos_payload)
-            return MockResponse({})
+            return _RESPONSES.get(url, _EMPTY_RESPONSE)
 
         cls.get_patcher = patch('requests.get', side_effect=side_effect)
         cls.get_patcher.start()
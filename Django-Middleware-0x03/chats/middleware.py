@@ -1,31 +1,104 @@
+import atexit
 import os
+import queue
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
+from time import monotonic
 from django.utils import timezone
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpResponseForbidden, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from collections import defaultdict, deque
+from functools import lru_cache
+
+def _protected_prefixes():
+    # Read at call time so settings are never frozen at import
+    return tuple(getattr(settings, 'ROLE_PROTECTED_PATH_PREFIXES', ['/api/messages', '/api/conversations']))
+
+
+# Shared by both role middlewares so a path is only matched once per process.
+@lru_cache(maxsize=4096)
+def _is_protected(path):
+    return path.startswith(_protected_prefixes())
+
+
+@receiver(setting_changed)
+def _reset_protected_paths(setting, **kwargs):
+    if setting == 'ROLE_PROTECTED_PATH_PREFIXES':
+        _is_protected.cache_clear()
 
 class RequestLoggingMiddleware: 
-    """Logs each request with timestamp, user (or anonymous), and path to a file."""
+    """Logs each request with timestamp, user (or anonymous), and path to a file.
+
+    The request thread only enqueues the formatted line; a daemon writer thread
+    owns a single open handle and flushes every `flush_every` lines or after
+    `flush_interval` seconds of inactivity. If the queue is full the line is
+    dropped so logging can never block a request.
+    """
+    queue_size = 10000
+    flush_every = 100
+    flush_interval = 0.5  # seconds
+
     def __init__(self, get_response):
         self.get_response = get_response
         self.log_file = getattr(settings, 'REQUEST_LOG_FILE', os.path.join(settings.BASE_DIR, 'requests.log'))
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()  # guards the file handle (writer thread vs. flush())
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        try:
+            self._fh = open(self.log_file, 'a', encoding='utf-8', buffering=1 << 16)
+        except Exception:
+            # Fail silently; logging must not break the app
+            self._fh = None
+            return
+        threading.Thread(target=self._writer, name='request-log-writer', daemon=True).start()
+        atexit.register(self.flush)
+
     def __call__(self, request):
         user = getattr(request, 'user', None)
         user_repr = getattr(user, 'username', 'anonymous') if user and user.is_authenticated else 'anonymous'
         # Match required format: f"{datetime.now()} - User: {user} - Path: {request.path}"
         line = f"{datetime.now()} - User: {user_repr} - Path: {request.path}\n"
+        if self._fh is not None:
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                pass
+        return self.get_response(request)
+
+    def _writer(self):
+        pending = 0
+        while True:
+            try:
+                line = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                line = None
+            try:
+                with self._lock:
+                    if line is not None:
+                        self._fh.write(line)
+                        pending += 1
+                    if pending and (line is None or pending >= self.flush_every):
+                        self._fh.flush()
+                        pending = 0
+            except Exception:
+                pending = 0
+
+    def flush(self):
+        """Write out any queued lines and flush the file (used at interpreter exit)."""
+        if self._fh is None:
+            return
         try:
             with self._lock:
-                with open(self.log_file, 'a', encoding='utf-8') as f:
-                    f.write(line)
+                while True:
+                    try:
+                        self._fh.write(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._fh.flush()
         except Exception:
-            # Fail silently; logging must not break the app
             pass
-        return self.get_response(request)
 
 class RestrictAccessByTimeMiddleware:
     """Restricts access to chat endpoints outside configured allowed hours.
@@ -44,6 +117,11 @@ class RestrictAccessByTimeMiddleware:
                 any(not isinstance(h, int) or h < 0 or h > 23 for h in self.allowed_hours)):
             # Fallback to safe default
             self.allowed_hours = (18, 21)
+        # Bit h is set when hour h is allowed, so the per-request check is a shift + AND
+        self._allowed_mask = 0
+        for hour in range(24):
+            if self._is_allowed_hour(hour):
+                self._allowed_mask |= 1 << hour
 
     def _is_allowed_hour(self, hour: int) -> bool:
         start_hour, end_hour = self.allowed_hours
@@ -57,9 +135,8 @@ class RestrictAccessByTimeMiddleware:
 
     def __call__(self, request):
         if request.path.startswith('/api/'):
-            # Use timezone aware current time
-            now_hour = timezone.now().astimezone(timezone.utc).hour if timezone.is_aware(timezone.now()) else timezone.now().hour
-            if not self._is_allowed_hour(now_hour):
+            # timezone.now() is already UTC when USE_TZ is enabled
+            if not (self._allowed_mask >> timezone.now().hour) & 1:
                 return HttpResponseForbidden('Chat access is restricted during this time.')
         return self.get_response(request)
 
@@ -69,38 +146,51 @@ class OffensiveLanguageMiddleware:
         self.get_response = get_response
         self.rate_limit = getattr(settings, 'CHAT_MESSAGE_RATE_LIMIT', 5)
         self.window_seconds = getattr(settings, 'CHAT_MESSAGE_RATE_WINDOW_SECONDS', 60)
-        # Map ip -> deque of timestamps
+        # Only honour X-Forwarded-For when a trusted proxy sets it; otherwise clients could spoof it
+        self.trust_forwarded_for = getattr(settings, 'CHAT_RATE_LIMIT_TRUST_X_FORWARDED_FOR', False)
+        # Map ip -> deque of monotonic() timestamps (plain floats compare cheaply)
         self.ip_timestamps: dict[str, deque] = defaultdict(deque)
         self._lock = threading.Lock()
+        # Every N recorded requests, drop IPs with no hits inside the window
+        self._sweep_counter = 0
+        self._sweep_every = 1024
     def __call__(self, request):
         if request.method == 'POST' and request.path.startswith('/api/messages'):
-            ip = self._get_ip(request)
-            now = datetime.utcnow()
-            window_start = now - timedelta(seconds=self.window_seconds)
+            meta = request.META
+            ip = self.trust_forwarded_for and meta.get('HTTP_X_FORWARDED_FOR', '').partition(',')[0].strip()
+            if not ip:
+                ip = meta.get('REMOTE_ADDR', '0.0.0.0')
+            ip_timestamps = self.ip_timestamps
+            now = monotonic()
+            cutoff = now - self.window_seconds
             with self._lock:
-                dq = self.ip_timestamps[ip]
+                dq = ip_timestamps[ip]
                 # Purge old entries
-                while dq and dq[0] < window_start:
+                while dq and dq[0] < cutoff:
                     dq.popleft()
                 if len(dq) >= self.rate_limit:
                     return JsonResponse({'error': 'Rate limit exceeded. Try again later.'}, status=429)
                 dq.append(now)
+                self._sweep_counter += 1
+                if self._sweep_counter % self._sweep_every == 0:
+                    self._sweep(cutoff)
         return self.get_response(request)
-    def _get_ip(self, request):
-        # Basic extraction; can be extended for X-Forwarded-For
-        return request.META.get('REMOTE_ADDR', '0.0.0.0')
+    def _sweep(self, cutoff):
+        # Caller holds self._lock
+        for ip, dq in list(self.ip_timestamps.items()):
+            if not dq or dq[-1] < cutoff:
+                del self.ip_timestamps[ip]
 
 class RolePermissionMiddleware:
     """Enforces that only users with specific roles can access protected chat endpoints."""
     def __init__(self, get_response):
         self.get_response = get_response
-        self.protected_prefixes = getattr(settings, 'ROLE_PROTECTED_PATH_PREFIXES', ['/api/messages', '/api/conversations'])
+        self.protected_prefixes = _protected_prefixes()
         # Backwards compatibility: previous implementation allowed 'host'.
         # New requirement (middleware 4) restricts to admin or moderator only.
-        self.allowed_roles = getattr(settings, 'ROLE_ALLOWED_ROLES', {'admin', 'moderator'})
+        self.allowed_roles = frozenset(getattr(settings, 'ROLE_ALLOWED_ROLES', {'admin', 'moderator'}))
     def __call__(self, request):
-        path = request.path
-        if any(path.startswith(prefix) for prefix in self.protected_prefixes):
+        if _is_protected(request.path):
             user = getattr(request, 'user', None)
             if not user or not user.is_authenticated:
                 return HttpResponseForbidden('Authentication required.')
@@ -126,12 +216,11 @@ class RolepermissionMiddleware:
     """
     def __init__(self, get_response):
         self.get_response = get_response
-        self.protected_prefixes = getattr(settings, 'ROLE_PROTECTED_PATH_PREFIXES', ['/api/messages', '/api/conversations'])
-        self.allowed_roles = getattr(settings, 'ROLE_ALLOWED_ROLES', {'admin', 'moderator'})
+        self.protected_prefixes = _protected_prefixes()
+        self.allowed_roles = frozenset(getattr(settings, 'ROLE_ALLOWED_ROLES', {'admin', 'moderator'}))
 
     def __call__(self, request):
-        path = request.path
-        if any(path.startswith(prefix) for prefix in self.protected_prefixes):
+        if _is_protected(request.path):
             user = getattr(request, 'user', None)
             if not user or not user.is_authenticated:
                 return HttpResponseForbidden('Authentication required.')
@@ -116,6 +116,7 @@ SIMPLE_JWT = {
 REQUEST_LOG_FILE = os.path.join(BASE_DIR, 'requests.log')
 CHAT_MESSAGE_RATE_LIMIT = 5  # messages per window
 CHAT_MESSAGE_RATE_WINDOW_SECONDS = 60  # 1 minute window
+CHAT_RATE_LIMIT_TRUST_X_FORWARDED_FOR = False  # enable only behind a proxy that sets the header
 ALLOWED_CHAT_HOURS = (18, 21)  # 6PM to 9PM (inclusive start, exclusive end)
 ROLE_PROTECTED_PATH_PREFIXES = ['/api/messages', '/api/conversations']
 ROLE_ALLOWED_ROLES = {'admin', 'moderator'}  # enforced by RolepermissionMiddleware
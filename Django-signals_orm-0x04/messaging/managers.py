@@ -9,13 +9,56 @@ class MessageQuerySet(models.QuerySet):
         return self.filter(parent_message__isnull=True)
 
     def with_immediate_replies(self):
-        from .models import Message  # local import to avoid circular
+        """Prefetch two levels of replies with participants (3 queries in total).
+
+        Replies land in ``replies1`` and their replies in ``replies2``; the
+        second level also carries reply_count so build_thread_tree() can tell
+        whether those two levels are the whole thread.
+        """
+        second_level = (
+            self.model.objects.with_participants()
+            .annotate(reply_count=models.Count('replies'))
+            .order_by('created_at', 'id')
+        )
+        first_level = (
+            self.model.objects.with_participants()
+            .prefetch_related(models.Prefetch('replies', queryset=second_level, to_attr='replies2'))
+            .order_by('created_at', 'id')
+        )
         return self.with_participants().prefetch_related(
-            models.Prefetch(
-                'replies',
-                queryset=Message.objects.with_participants().order_by('created_at')
-            )
+            models.Prefetch('replies', queryset=first_level, to_attr='replies1')
+        )
+
+    def bulk_send(self, messages, batch_size=500):
+        """Insert many messages plus their notifications in two bulk INSERTs.
+
+        bulk_create() skips the Message signals, so this does their work in
+        batch: fill in the thread root, create one Notification per message
+        and drop the cached trees of the threads that got replies.
+        """
+        from django.core.cache import cache
+        from .models import Notification, thread_cache_key  # local import to avoid circular
+
+        messages = list(messages)
+        # roots of parents that were only given by id, fetched in one query
+        parent_ids = {m.parent_message_id for m in messages
+                      if m.parent_message_id and not m.__class__.parent_message.is_cached(m)}
+        parent_roots = dict(self.filter(pk__in=parent_ids).values_list('pk', 'root_id')) if parent_ids else {}
+        for m in messages:
+            if not m.parent_message_id:
+                m.root_id = None
+            elif m.parent_message_id in parent_roots:
+                m.root_id = parent_roots[m.parent_message_id] or m.parent_message_id
+            else:
+                m.root_id = m.parent_message.root_id or m.parent_message_id
+
+        created = self.bulk_create(messages, batch_size=batch_size)
+        Notification.objects.bulk_create(
+            [Notification(user_id=m.receiver_id, message=m) for m in created],
+            batch_size=batch_size,
         )
+        cache.delete_many({thread_cache_key(m.root_id) for m in created if m.root_id})
+        return created
 
     # kept for completeness, not strictly needed for the required API name
     def unread_for(self, user):
@@ -32,3 +75,11 @@ class UnreadMessagesManager(models.Manager):
 
     def unread_for_user(self, user):
         return self.get_queryset().filter(receiver=user)
+
+    def count_for(self, user):
+        """Unread badge count for user.
+
+        A bare COUNT on (receiver, read=False) that the partial msg_unread_idx
+        index answers on its own; no message rows (or TEXT content) are read.
+        """
+        return self.unread_for_user(user).values('id').count()
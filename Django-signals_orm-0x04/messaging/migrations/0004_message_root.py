@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_thread_roots(apps, schema_editor):
+    """Fill root for existing replies one depth level per UPDATE."""
+    Message = apps.get_model('messaging', 'Message')
+    Message.objects.filter(
+        parent_message__isnull=False, parent_message__parent_message__isnull=True
+    ).update(root=F('parent_message'))
+    parent_root = Message.objects.filter(pk=OuterRef('parent_message')).values('root')[:1]
+    while Message.objects.filter(root__isnull=True, parent_message__root__isnull=False).update(
+        root=Subquery(parent_root)
+    ):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_members', to='messaging.message'),
+        ),
+        migrations.RunPython(backfill_thread_roots, migrations.RunPython.noop),
+    ]
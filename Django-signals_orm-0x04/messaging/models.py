@@ -1,11 +1,20 @@
 from django.conf import settings
-from django.db import models
-from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.db import connection, models, transaction
+from django.db.models import Q
 
 from .managers import MessageQuerySet, UnreadMessagesManager
+from .responses import format_datetime
 
 User = settings.AUTH_USER_MODEL
 
+# Rendered thread trees are cached per root and dropped by the Message signals
+THREAD_CACHE_TIMEOUT = 60 * 60
+
+
+def thread_cache_key(root_id):
+    return f"thread:{root_id}"
+
 
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
@@ -19,6 +28,17 @@ class Message(models.Model):
         related_name='replies',
         help_text='If set, this message is a reply to parent_message.'
     )
+    # Denormalized thread root (null on roots themselves), filled in by a pre_save
+    # signal so a whole thread is one indexed WHERE root_id = ? lookup
+    root = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='thread_members',
+        db_index=True,
+        editable=False
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     # edit tracking
@@ -39,78 +59,203 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # inbox listing, unread inbox and inbox roots (see views.py)
+            models.Index(fields=['receiver', '-created_at'], name='msg_recv_created_idx'),
+            models.Index(fields=['receiver', '-created_at'], name='msg_unread_idx', condition=Q(read=False)),
+            models.Index(
+                fields=['receiver', 'parent_message', '-created_at'],
+                name='msg_roots_idx',
+                condition=Q(parent_message__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} to {self.receiver}"
 
+    def save(self, *args, **kwargs):
+        # Edits run in one transaction so the pre_save history check can lock
+        # the row (SELECT ... FOR UPDATE) until our UPDATE has landed
+        if self.pk is None:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            return super().save(*args, **kwargs)
+
     # --- Thread helpers (simple + junior friendly) ---
     @property
     def is_root(self):
         return self.parent_message_id is None
 
+    @classmethod
+    def _descendants_cte(cls, columns):
+        """SQL for a recursive CTE ``t`` holding ``columns`` of every reply below %s.
+
+        The walk over parent_message links happens inside the database, so a
+        whole subtree costs one query however deep it goes. UNION (not
+        UNION ALL) stops the walk if bad data ever forms a cycle.
+        """
+        table = cls._meta.db_table
+        return (
+            f"WITH RECURSIVE t AS ("
+            f"SELECT {columns} FROM {table} m WHERE m.parent_message_id = %s "
+            f"UNION SELECT {columns} FROM {table} m JOIN t ON m.parent_message_id = t.id)"
+        )
+
+    @classmethod
+    def _ancestors_cte(cls):
+        """SQL for a recursive CTE ``t`` of (id, parent_message_id) from %s up to its root."""
+        table = cls._meta.db_table
+        return (
+            f"WITH RECURSIVE t AS ("
+            f"SELECT m.id, m.parent_message_id FROM {table} m WHERE m.id = %s "
+            f"UNION SELECT m.id, m.parent_message_id FROM {table} m JOIN t ON m.id = t.parent_message_id)"
+        )
+
+    @classmethod
+    def ancestor_root_id(cls, msg_id):
+        """Return the id of the thread root above msg_id in one query, however deep.
+
+        None if the chain never reaches a root (a removed ancestor, or a cycle).
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(cls._ancestors_cte() + " SELECT id FROM t WHERE parent_message_id IS NULL", [msg_id])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def descendants_of(cls, root_id):
+        """Return every reply below root_id (any depth), oldest first."""
+        return list(cls.objects.raw(
+            cls._descendants_cte('m.*') + " SELECT * FROM t ORDER BY created_at, id",
+            [root_id],
+        ))
+
     def get_all_replies(self):
         """Return a flat list of ALL descendant replies (any depth).
 
-        Uses iterative breadth-first querying to keep memory simple.
-        (Each level = 1 query; fine for modest thread depth.)
+        One query for the subtree (root_id for a whole thread, the recursive
+        CTE below a reply) plus one in_bulk() for the users, whatever the
+        depth. Parents are wired up from the same list so walking
+        parent_message afterwards costs nothing.
         """
-        descendants = []
-        current_ids = [self.id]
-        # we always select related users for display efficiency
-        while current_ids:
-            children = list(
-                Message.objects.filter(parent_message_id__in=current_ids)
-                .select_related('sender', 'receiver', 'parent_message')
-                .order_by('created_at')
-            )
-            if not children:
-                break
-            descendants.extend(children)
-            current_ids = [m.id for m in children]
+        if self.is_root:
+            descendants = list(Message.objects.filter(root_id=self.id).order_by('created_at', 'id'))
+        else:
+            descendants = Message.descendants_of(self.id)
+        if not descendants:
+            return descendants
+        user_ids = {m.sender_id for m in descendants} | {m.receiver_id for m in descendants}
+        users = get_user_model().objects.in_bulk(user_ids)
+        by_id = {m.id: m for m in descendants}
+        by_id[self.id] = self
+        for m in descendants:
+            if m.sender_id in users:
+                m.sender = users[m.sender_id]
+            if m.receiver_id in users:
+                m.receiver = users[m.receiver_id]
+            m.parent_message = by_id[m.parent_message_id]
         return descendants
 
+    @property
+    def thread_root_id(self):
+        """Id of this thread's root, without a query once root_id is filled in."""
+        if self.is_root:
+            return self.id
+        return self.root_id or Message.ancestor_root_id(self.id)
+
+    def get_thread_root(self):
+        """Return the root message of this thread.
+
+        Uses the denormalized root FK; rows saved without it (bulk/raw
+        writes) fall back to one recursive query up the parent_message links.
+        """
+        if self.is_root:
+            return self
+        if self.root_id:
+            return self.root
+        table = Message._meta.db_table
+        found = list(Message.objects.raw(
+            Message._ancestors_cte()
+            + f" SELECT m.* FROM {table} m JOIN t ON m.id = t.id WHERE t.parent_message_id IS NULL",
+            [self.id],
+        ))
+        return found[0] if found else self
+
     def get_thread_messages(self):
         """Return [root_message] + all its descendants (flat list).
 
         If self is not the root we climb up first. List is ordered by
         created_at ascending inside each depth when later rendered.
         """
-        root = self
-        seen = set()
-        # climb to root (depth usually tiny)
-        while root.parent_message_id and root.parent_message_id not in seen:
-            seen.add(root.id)
-            root = root.parent_message  # already in memory due to select_related if caller used it
+        root = self.get_thread_root()
         return [root] + root.get_all_replies()
 
     def build_thread_tree(self):
         """Return a nested dict representing the thread for easy JSON/DRF use.
 
-        We first fetch every descendant in a handful of queries (by depth),
-        then build an in-memory tree so rendering is O(n).
+        The root and all its descendants come back from one values() query
+        (no model instances), then we build an in-memory tree so rendering
+        is O(n). Roots loaded through with_immediate_replies() are rendered
+        from the prefetched levels when those cover the whole thread.
         """
-        root = self.get_thread_messages()[0]
-        all_msgs = root.get_thread_messages()  # root + descendants
-        # Map parent_id -> list of children
+        if self.is_root and hasattr(self, 'replies1'):
+            tree = self._tree_from_prefetch()
+            if tree is not None:
+                return tree
+        root_id = self.thread_root_id
+        rows = (
+            Message.objects
+            .filter(Q(pk=root_id) | Q(root_id=root_id))
+            .order_by('created_at', 'id')
+            .values('id', 'content', 'parent_message_id', 'created_at', 'edited',
+                    'sender__username', 'receiver__username')
+        )
+        # Map parent_id -> list of children, already in created_at order
         children_map = {}
-        for m in all_msgs[1:]:  # skip root which is first
-            children_map.setdefault(m.parent_message_id, []).append(m)
-        # sort each child group by created_at ascending (natural convo flow)
-        for group in children_map.values():
-            group.sort(key=lambda x: x.created_at)
+        root = None
+        for row in rows:
+            if row['id'] == root_id:
+                root = row
+            else:
+                children_map.setdefault(row['parent_message_id'], []).append(row)
 
-        def serialize(msg):
+        def serialize(row):
+            return {
+                'id': row['id'],
+                'content': row['content'],
+                'sender': row['sender__username'],
+                'receiver': row['receiver__username'],
+                'created_at': format_datetime(row['created_at']),
+                'edited': row['edited'],
+                'replies': [serialize(child) for child in children_map.get(row['id'], [])]
+            }
+
+        return serialize(root)
+
+    def _tree_from_prefetch(self):
+        """Build the tree from with_immediate_replies() data, without queries.
+
+        Returns None when some second-level reply has replies of its own
+        (reply_count), i.e. the two prefetched levels are not the whole thread.
+        """
+        if any(grandchild.reply_count for child in self.replies1 for grandchild in child.replies2):
+            return None
+
+        def serialize(msg, replies):
             return {
                 'id': msg.id,
                 'content': msg.content,
-                'sender': getattr(msg.sender, 'username', msg.sender_id),
-                'receiver': getattr(msg.receiver, 'username', msg.receiver_id),
-                'created_at': timezone.localtime(msg.created_at).isoformat() if msg.created_at else None,
+                'sender': msg.sender.username,
+                'receiver': msg.receiver.username,
+                'created_at': format_datetime(msg.created_at),
                 'edited': msg.edited,
-                'replies': [serialize(child) for child in children_map.get(msg.id, [])]
+                'replies': replies,
             }
 
-        return serialize(root)
+        return serialize(self, [
+            serialize(child, [serialize(grandchild, []) for grandchild in child.replies2])
+            for child in self.replies1
+        ])
 
 
 class Notification(models.Model):
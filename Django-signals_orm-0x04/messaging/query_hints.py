@@ -0,0 +1,50 @@
+"""Derive select_related / prefetch_related / only() from the fields a view renders.
+
+Views list the ORM paths they actually read (e.g. 'content', 'sender__username')
+and the query shape follows from that list, so the two cannot drift apart.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def infer_query_hints(model, fields):
+    """Return (select, prefetch, only) tuples for reading ``fields`` of ``model``.
+
+    Walking each path through ``_meta.get_field``:
+    - a forward FK / one-to-one that is followed further (or a reverse
+      one-to-one, which has no column of its own) goes to select_related
+    - a many-valued relation (M2M, reverse FK) goes to prefetch_related and ends
+      the walk, since its rows come from a separate query anyway
+    - anything else is a column, collected for only()
+    """
+    select, prefetch, only = [], [], []
+    for path in fields:
+        opts = model._meta
+        parts = path.split('__')
+        for i, part in enumerate(parts):
+            field = opts.get_field(part)
+            prefix = '__'.join(parts[:i + 1])
+            if field.many_to_many or field.one_to_many:
+                if prefix not in prefetch:
+                    prefetch.append(prefix)
+                break
+            if field.is_relation and (i < len(parts) - 1 or not field.concrete):
+                if prefix not in select:
+                    select.append(prefix)
+                opts = field.related_model._meta
+                continue
+            if path not in only:
+                only.append(path)
+    return tuple(select), tuple(prefetch), tuple(only)
+
+
+def apply_query_hints(queryset, fields):
+    """Shape ``queryset`` so reading ``fields`` on its rows needs no extra queries."""
+    select, prefetch, only = infer_query_hints(queryset.model, tuple(fields))
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if only:
+        queryset = queryset.only(*only)
+    return queryset
@@ -0,0 +1,50 @@
+"""JSON responses encoded with orjson when it is installed.
+
+Every endpoint writes datetimes the way orjson does: ISO 8601 in UTC with a
+'Z' suffix, with microseconds unless they are zero.
+"""
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json works the same way
+    orjson = None
+
+
+def format_datetime(value):
+    """Render a datetime as orjson would (naive values are taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    else:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.isoformat().replace('+00:00', 'Z')
+
+
+class _JSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder with orjson's datetime format instead of milliseconds."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return format_datetime(o)
+        return super().default(o)
+
+
+def dumps_json(data):
+    """Encode data to JSON bytes; datetimes come out as ISO 8601 (UTC as 'Z')."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=_JSONEncoder).encode()
+
+
+class OrjsonResponse(HttpResponse):
+    """Like JsonResponse, but encodes through dumps_json()."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps_json(data), **kwargs)
@@ -1,18 +1,36 @@
-from django.db.models.signals import post_save, pre_save, post_delete
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 
-from .models import Message, Notification, MessageHistory
+from .models import Message, Notification, MessageHistory, thread_cache_key
 
 
 @receiver(post_save, sender=Message)
 def create_message_notification(sender, instance, created, **kwargs):
-    # When a new message is created, make a notification for the receiver
-    if created:
-        Notification.objects.create(user=instance.receiver, message=instance)
+    # When a new message is created, make a notification for the receiver.
+    # Fixture loads (raw) bring their own rows; Message.objects.bulk_send()
+    # creates notifications in bulk without going through this signal.
+    if created and not kwargs.get('raw'):
+        Notification.objects.create(user_id=instance.receiver_id, message=instance)
+
+
+@receiver(pre_save, sender=Message)
+def set_thread_root(sender, instance, **kwargs):
+    # Replies inherit their parent's root; a direct reply's root is the parent itself
+    if not instance.parent_message_id:
+        instance.root_id = None
+    elif instance._state.adding and instance.root_id and not Message.parent_message.is_cached(instance):
+        # a new reply whose creator already resolved the root (create_message)
+        return
+    else:
+        parent = instance.parent_message
+        instance.root_id = parent.root_id or parent.id
 
 
 @receiver(pre_save, sender=Message)
@@ -24,26 +42,75 @@ def store_previous_version(sender, instance, **kwargs):
     """
     if not instance.pk:  # new message, nothing to version
         return
-    try:
-        old = Message.objects.get(pk=instance.pk)
-    except Message.DoesNotExist:
+    # Only the old content is compared, so fetch just that column. Message.save()
+    # wraps edits in a transaction; the row lock makes concurrent editors queue
+    # up instead of both versioning the same old content.
+    old_content = (
+        Message.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values_list('content', flat=True)
+        .first()
+    )
+    if old_content is None:
         return
     # Only act if content actually changed
-    if old.content != instance.content:
+    if old_content != instance.content:
         MessageHistory.objects.create(
-            message=old,
-            old_content=old.content,
-            edited_by=instance.edited_by  # may be None
+            message_id=instance.pk,
+            old_content=old_content,
+            edited_by_id=instance.edited_by_id  # may be None
         )
         instance.edited = True
         if instance.edited_at is None:
             instance.edited_at = timezone.now()
 
 
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_thread_cache(sender, instance, **kwargs):
+    """Drop the cached tree of the thread this message belongs to."""
+    root_id = instance.thread_root_id
+    if root_id is None:
+        # An ancestor went in the same cascade; the delete of the topmost
+        # removed message (whose parent still exists) clears the cache.
+        return
+    cache.delete(thread_cache_key(root_id))
+
+
 # --- User cleanup signals ---
 User = get_user_model()
 
 
+@receiver(post_save, sender=User)
+def invalidate_user_thread_caches(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached trees of every thread the user wrote or received in.
+
+    The cached trees embed usernames, so a rename would otherwise be served
+    stale until the timeout. Saves that cannot touch the username (e.g. the
+    last_login update on every login) are skipped.
+    """
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    root_ids = (
+        Message.objects.filter(Q(sender=instance) | Q(receiver=instance))
+        .values_list(Coalesce('root_id', 'id'), flat=True)
+        .distinct()
+    )
+    cache.delete_many([thread_cache_key(root_id) for root_id in root_ids])
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_edit_history(sender, instance, **kwargs):
+    """Delete MessageHistory rows where the user was only the editor.
+
+    Runs before the delete: by post_delete Django has already applied
+    SET_NULL to edited_by, so those rows could no longer be matched.
+    MessageHistory has no dependents or delete signals, so the collector
+    fast-deletes these with one DELETE ... WHERE edited_by_id = %s.
+    """
+    MessageHistory.objects.filter(edited_by=instance).delete()
+
+
 @receiver(post_delete, sender=User)
 def delete_user_related_data(sender, instance, **kwargs):
     """Extra cleanup after a user is deleted.
@@ -51,8 +118,8 @@ def delete_user_related_data(sender, instance, **kwargs):
     Thanks to on_delete=CASCADE most related rows (messages, notifications, histories
     linked via messages) are already removed automatically by the database.
 
-    We still explicitly remove MessageHistory rows where the user only appears as
-    'edited_by' (that FK uses SET_NULL so they would otherwise remain). The
+    Histories where the user only appears as 'edited_by' (that FK uses SET_NULL so
+    they would otherwise remain) are removed by delete_user_edit_history above. The
     requirement says: delete all message histories associated with the user.
     """
     # Explicit deletions (even though CASCADE handles most) to satisfy requirement.
@@ -62,5 +129,3 @@ def delete_user_related_data(sender, instance, **kwargs):
     #    notifications tied to those messages and message history rows for them)
     Message.objects.filter(sender=instance).delete()
     Message.objects.filter(receiver=instance).delete()
-    # 3. Delete histories where user was only the editor (SET_NULL would leave them)
-    MessageHistory.objects.filter(edited_by=instance).delete()
\ No newline at end of file
@@ -1,7 +1,12 @@
-from django.test import TestCase
+import json
+from unittest import mock
+
+from django.test import RequestFactory, TestCase
 from django.contrib.auth import get_user_model
 
+from . import responses
 from .models import Message, Notification, MessageHistory
+from .views import create_message
 
 User = get_user_model()
 
@@ -96,4 +101,155 @@ class MessageSignalTests(TestCase):
         self.assertEqual(tree['content'], 'Root')
         self.assertEqual(len(tree['replies']), 1)
         self.assertEqual(tree['replies'][0]['content'], 'r1')
-        self.assertEqual(len(tree['replies'][0]['replies']), 1)
\ No newline at end of file
+        self.assertEqual(len(tree['replies'][0]['replies']), 1)
+
+    def test_get_all_replies_query_count_independent_of_depth(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        parent = root
+        for i in range(5):
+            parent = Message.objects.create(sender=self.bob, receiver=self.alice, content=f'd{i}', parent_message=parent)
+        # one recursive query for the subtree + one in_bulk for the users
+        with self.assertNumQueries(2):
+            flat = root.get_all_replies()
+            self.assertEqual([m.content for m in flat], [f'd{i}' for i in range(5)])
+            self.assertEqual(flat[-1].sender, self.bob)
+            self.assertEqual(flat[-1].parent_message.parent_message, flat[-3])
+
+    def test_build_thread_tree_from_reply_single_query(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        r1 = Message.objects.create(sender=self.bob, receiver=self.alice, content='r1', parent_message=root)
+        r1_1 = Message.objects.create(sender=self.alice, receiver=self.bob, content='r1_1', parent_message=r1)
+        Message.objects.create(sender=self.bob, receiver=self.alice, content='r2', parent_message=root)
+        r1_1 = Message.objects.select_related('parent_message__parent_message').get(pk=r1_1.pk)
+        with self.assertNumQueries(1):
+            tree = r1_1.build_thread_tree()
+        self.assertEqual(tree['id'], root.id)
+        self.assertEqual([r['content'] for r in tree['replies']], ['r1', 'r2'])
+        self.assertEqual(tree['replies'][0]['replies'][0]['sender'], 'alice')
+
+    def test_thread_cache_dropped_when_thread_changes(self):
+        from django.core.cache import cache
+        from .models import thread_cache_key
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        r1 = Message.objects.create(sender=self.bob, receiver=self.alice, content='r1', parent_message=root)
+        key = thread_cache_key(root.id)
+        cache.set(key, '{}')
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='r1_1', parent_message=r1)
+        self.assertIsNone(cache.get(key))
+        cache.set(key, '{}')
+        r1.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_thread_cache_dropped_when_user_renamed(self):
+        from django.core.cache import cache
+        from .models import thread_cache_key
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        reply = Message.objects.create(sender=self.bob, receiver=self.alice, content='R', parent_message=root)
+        key = thread_cache_key(reply.thread_root_id)
+        cache.set(key, '{}')
+        self.bob.save(update_fields=['last_login'])
+        self.assertEqual(cache.get(key), '{}')
+        self.bob.username = 'robert'
+        self.bob.save()
+        self.assertIsNone(cache.get(key))
+
+    def test_replies_record_thread_root(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        r1 = Message.objects.create(sender=self.bob, receiver=self.alice, content='r1', parent_message=root)
+        r1_1 = Message.objects.create(sender=self.alice, receiver=self.bob, content='r1_1', parent_message=r1)
+        self.assertIsNone(root.root_id)
+        self.assertEqual(r1.root_id, root.id)
+        self.assertEqual(r1_1.root_id, root.id)
+        self.assertEqual(set(root.thread_members.all()), {r1, r1_1})
+        with self.assertNumQueries(1):
+            self.assertEqual(r1_1.get_thread_root(), root)
+
+    def test_bulk_send_creates_notifications_in_bulk(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        reply = Message.objects.create(sender=self.bob, receiver=self.alice, content='r1', parent_message=root)
+        batch = [Message(sender=self.alice, receiver=self.bob, content=f'b{i}') for i in range(3)]
+        batch.append(Message(sender=self.alice, receiver=self.bob, content='r1_1', parent_message_id=reply.id))
+        Notification.objects.all().delete()
+        # parent roots, messages, notifications
+        with self.assertNumQueries(3):
+            created = Message.objects.bulk_send(batch)
+        self.assertEqual(len(created), 4)
+        self.assertEqual(Notification.objects.filter(user=self.bob).count(), 4)
+        self.assertEqual(Message.objects.get(content='r1_1').root_id, root.id)
+
+    def test_infer_query_hints(self):
+        from .query_hints import infer_query_hints
+        select, prefetch, only = infer_query_hints(
+            Message, ('content', 'sender__username', 'root__receiver', 'replies__content')
+        )
+        self.assertEqual(select, ('sender', 'root'))
+        self.assertEqual(prefetch, ('replies',))
+        self.assertEqual(only, ('content', 'sender__username', 'root__receiver'))
+
+    def test_thread_root_found_without_denormalized_root(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        parent = root
+        for i in range(4):
+            parent = Message.objects.create(sender=self.bob, receiver=self.alice, content=f'd{i}', parent_message=parent)
+        Message.objects.update(root=None)  # as if written by a bulk/raw path
+        leaf = Message.objects.get(pk=parent.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(leaf.get_thread_root(), root)
+        self.assertEqual(leaf.thread_root_id, root.id)
+
+    def test_deleting_editor_removes_their_history(self):
+        carol = User.objects.create_user(username='carol', password='pass1234')
+        msg = Message.objects.create(sender=self.alice, receiver=self.bob, content='v1')
+        msg.content = 'v2'
+        msg.edited_by = carol
+        msg.save()
+        carol.delete()
+        self.assertFalse(MessageHistory.objects.filter(message=msg).exists())
+        self.assertTrue(Message.objects.filter(pk=msg.pk).exists())
+
+    def test_build_thread_tree_uses_prefetched_levels(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        r1 = Message.objects.create(sender=self.bob, receiver=self.alice, content='r1', parent_message=root)
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='r2', parent_message=root)
+        r1_1 = Message.objects.create(sender=self.alice, receiver=self.bob, content='r1_1', parent_message=r1)
+        expected = root.build_thread_tree()
+        with self.assertNumQueries(3):
+            loaded = Message.objects.roots().with_immediate_replies().get(pk=root.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(loaded.build_thread_tree(), expected)
+        # a third level is not prefetched, so the tree falls back to its query
+        Message.objects.create(sender=self.bob, receiver=self.alice, content='deep', parent_message=r1_1)
+        loaded = Message.objects.roots().with_immediate_replies().get(pk=root.pk)
+        with self.assertNumQueries(1):
+            tree = loaded.build_thread_tree()
+        self.assertEqual(tree['replies'][0]['replies'][0]['replies'][0]['content'], 'deep')
+
+    def test_unread_count_for_user(self):
+        for i in range(3):
+            Message.objects.create(sender=self.alice, receiver=self.bob, content=f'm{i}')
+        Message.objects.create(sender=self.alice, receiver=self.bob, content='seen', read=True)
+        Message.objects.create(sender=self.bob, receiver=self.alice, content='other')
+        with self.assertNumQueries(1):
+            self.assertEqual(Message.unread.count_for(self.bob), 3)
+
+    def test_timestamps_match_across_endpoints_and_encoders(self):
+        root = Message.objects.create(sender=self.alice, receiver=self.bob, content='Root')
+        encoded = responses.dumps_json(root.created_at)
+        with mock.patch.object(responses, 'orjson', None):
+            self.assertEqual(responses.dumps_json(root.created_at), encoded)
+        created_at = root.build_thread_tree()['created_at']
+        self.assertTrue(created_at.endswith('Z'))
+        self.assertEqual(f'"{created_at}"'.encode(), encoded)
+
+    def _create_message(self, **data):
+        request = RequestFactory().post('/messages/create/', json.dumps(data), content_type='application/json')
+        request.user = self.alice
+        return create_message(request)
+
+    def test_create_reply_echoes_integer_ids(self):
+        root = Message.objects.create(sender=self.bob, receiver=self.alice, content='Root')
+        response = self._create_message(receiver_id=str(self.bob.pk), content='Reply', parent_id=str(root.pk))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content)['parent_message'], root.pk)
+        response = self._create_message(receiver_id=str(self.bob.pk), content='Reply', parent_id='abc')
+        self.assertEqual(response.status_code, 400)
@@ -1,15 +1,19 @@
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_http_methods
-from django.http import JsonResponse, HttpResponseNotAllowed, HttpResponseBadRequest
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseNotAllowed, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Exists, Q, Subquery
+from django.db.models.functions import Substr
 import json
 
 from django.contrib.auth import get_user_model
 
-from .models import Message
+from .models import Message, THREAD_CACHE_TIMEOUT, thread_cache_key
+from .query_hints import apply_query_hints
+from .responses import OrjsonResponse, dumps_json, format_datetime
 
 
 @login_required
@@ -57,106 +61,180 @@ def create_message(request):
     parent_id = data.get('parent_id')
     if not receiver_id or not content.strip():
         return HttpResponseBadRequest('receiver_id and content required')
-
+    # Ids arrive as strings from forms; the response echoes them as ints
     try:
-        receiver = User.objects.get(pk=receiver_id)
-    except User.DoesNotExist:
-        return HttpResponseBadRequest('Receiver not found')
-
-    parent_message = None
+        receiver_id = int(receiver_id)
+        parent_id = int(parent_id) if parent_id else None
+    except (TypeError, ValueError):
+        return HttpResponseBadRequest('receiver_id and parent_id must be integers')
+
+    # One round-trip validates both ids: the receiver row, annotated with
+    # whether the parent exists and which thread root it belongs to
+    lookup = User.objects.filter(pk=receiver_id).values('pk', 'username')
     if parent_id:
-        parent_message = get_object_or_404(
-            Message.objects.select_related('sender', 'receiver', 'parent_message'), pk=parent_id
+        parent_qs = Message.objects.filter(pk=parent_id)
+        lookup = lookup.annotate(
+            parent_found=Exists(parent_qs),
+            parent_root_id=Subquery(parent_qs.values('root_id')[:1]),
         )
+    receiver = lookup.first()
+    if receiver is None:
+        return HttpResponseBadRequest('Receiver not found')
+    if parent_id and not receiver['parent_found']:
+        raise Http404('Parent message not found')
 
-    msg = Message.objects.create(
+    msg = Message(
         sender=request.user,  # explicit for requirement token: sender=request.user
-        receiver=receiver,
+        receiver_id=receiver['pk'],
         content=content,
-        parent_message=parent_message
+        parent_message_id=parent_id,
     )
+    if parent_id:
+        # already known from the lookup, so set_thread_root needn't load the parent
+        msg.root_id = receiver['parent_root_id'] or msg.parent_message_id
+    msg.save()
 
     return JsonResponse({
         'id': msg.id,
         'content': msg.content,
         'sender': request.user.username,
-        'receiver': receiver.username,
-        'parent_message': parent_message.id if parent_message else None,
-        'created_at': timezone.localtime(msg.created_at).isoformat() if msg.created_at else None,
+        'receiver': receiver['username'],
+        'parent_message': msg.parent_message_id,
+        'created_at': format_datetime(msg.created_at),
         'is_root': msg.is_root,
     }, status=201)
 
 
+INBOX_PAGE_SIZE = 50
+# List endpoints only show the start of each message; the database cuts it
+# so full TEXT bodies never leave it (thread_detail returns full content)
+PREVIEW_LENGTH = 80
+
+# What each endpoint reads off its Message rows; query_hints turns these into
+# select_related()/only() so the query shape follows the rendering code.
+INBOX_FIELDS = ('id', 'sender__username', 'receiver__username', 'created_at')
+# thread_detail only checks participants on the message and its root
+THREAD_ENTRY_FIELDS = (
+    'sender', 'receiver', 'parent_message',
+    'root__sender', 'root__receiver', 'root__parent_message',
+)
+
+
+def _page_before(qs, request):
+    """Keyset pagination: ?before=<message id> keeps rows older than that message.
+
+    Rows are ordered by (-created_at, -id), so the cursor compares on both
+    columns (inside SQL, via a subquery for the anchor's timestamp) instead
+    of an OFFSET that would rescan every skipped row. Returns None for a
+    malformed cursor.
+    """
+    before = request.GET.get('before')
+    if not before:
+        return qs
+    try:
+        before = int(before)
+    except ValueError:
+        return None
+    anchor = Subquery(Message.objects.filter(pk=before).values('created_at')[:1])
+    return qs.filter(Q(created_at__lt=anchor) | Q(created_at=anchor, id__lt=before))
+
+
+def _next_cursor(results):
+    # a full page means there may be more; hand back the last id as the cursor
+    return results[-1]['id'] if len(results) == INBOX_PAGE_SIZE else None
+
+
 @login_required
 @cache_page(60)
 def inbox_threads(request):
     """List root messages sent to the current user plus first-level replies.
 
-    Demonstrates Message.objects.filter + select_related + prefetch_related usage.
+    Demonstrates Message.objects.filter + query hints (select_related/only from
+    INBOX_FIELDS) + an annotated reply count.
+    Pages of 50, older pages via ?before=<next>.
     """
-    qs = (
-        Message.objects
-        .filter(receiver=request.user, parent_message__isnull=True)  # Message.objects.filter receiver requirement
-        .select_related('sender', 'receiver')
-        .prefetch_related('replies')  # first level only
-        .order_by('-created_at')
+    qs = _page_before(
+        apply_query_hints(
+            Message.objects.filter(receiver=request.user, parent_message__isnull=True),  # Message.objects.filter receiver requirement
+            INBOX_FIELDS,
+        )
+        .annotate(
+            reply_count=Count('replies'),  # first level only, counted in SQL
+            content_preview=Substr('content', 1, PREVIEW_LENGTH),
+        )
+        .order_by('-created_at', '-id'),
+        request,
     )
+    if qs is None:
+        return HttpResponseBadRequest('before must be a message id')
 
     data = []
-    for m in qs[:50]:  # basic cap
+    # iterator() streams rows (server-side cursor where supported) instead of
+    # caching the whole result on the queryset
+    for m in qs[:INBOX_PAGE_SIZE].iterator(chunk_size=500):
         data.append({
             'id': m.id,
-            'content': m.content,
+            'content_preview': m.content_preview,
             'sender': m.sender.username,
             'receiver': m.receiver.username,
-            'created_at': timezone.localtime(m.created_at).isoformat(),
-            'reply_count': m.replies.count(),
+            'created_at': m.created_at,  # encoded by orjson, no per-row isoformat()
+            'reply_count': m.reply_count,
         })
-    return JsonResponse({'results': data})
+    return OrjsonResponse({'results': data, 'next': _next_cursor(data)})
 
 
 @login_required
 def unread_inbox(request):
     """Return ONLY unread messages for the current user.
 
-    Uses the secondary manager Message.unread plus only() to trim columns
-    (we still need sender/receiver FKs so include their ids for DRF/basic JSON).
-    Keeping logic very small & junior friendly.
+    Uses the secondary manager Message.unread with a values() projection, so
+    no model instances are built; usernames come from the join.
+    Pages of 50, older pages via ?before=<next>.
     """
-    qs = (
+    qs = _page_before(
         Message.unread.unread_for_user(request.user)
-        .only('id', 'content', 'sender', 'receiver', 'created_at')
-        .select_related('sender', 'receiver')
-        .order_by('-created_at')
+        .order_by('-created_at', '-id')
+        .annotate(content_preview=Substr('content', 1, PREVIEW_LENGTH))
+        .values('id', 'content_preview', 'sender__username', 'receiver__username', 'created_at', 'read'),
+        request,
     )
+    if qs is None:
+        return HttpResponseBadRequest('before must be a message id')
     results = []
-    for m in qs[:50]:
+    for m in qs[:INBOX_PAGE_SIZE].iterator(chunk_size=500):
         results.append({
-            'id': m.id,
-            'content': m.content,
-            'sender': getattr(m.sender, 'username', m.sender_id),
-            'receiver': getattr(m.receiver, 'username', m.receiver_id),
-            'created_at': timezone.localtime(m.created_at).isoformat() if m.created_at else None,
-            'read': m.read,
+            'id': m['id'],
+            'content_preview': m['content_preview'],
+            'sender': m['sender__username'],
+            'receiver': m['receiver__username'],
+            'created_at': m['created_at'],
+            'read': m['read'],
         })
-    return JsonResponse({'results': results})
+    return OrjsonResponse({'results': results, 'next': _next_cursor(results)})
 
 
 @login_required
 def thread_detail(request, message_id):
     """Return full thread (root + nested replies) for a given message.
 
-    We use select_related to pull basic FKs for the entry point, then rely on the
-    iterative helper inside the model which does small batched queries.
+    The entry point loads just the participant columns of the message and its
+    root (see THREAD_ENTRY_FIELDS), then the model
+    builds the whole tree from a single values() query. The encoded tree is
+    cached per root until a message in the thread changes.
     """
     message = get_object_or_404(
-        Message.objects.select_related('sender', 'receiver', 'parent_message'),
+        apply_query_hints(Message.objects.all(), THREAD_ENTRY_FIELDS),
         pk=message_id
     )
     # permission: allow if user participates anywhere in thread (simple check)
-    root = message.get_thread_messages()[0]
-    if request.user not in {root.sender, root.receiver, message.sender, message.receiver}:
+    root = message.get_thread_root()
+    if request.user.pk not in {root.sender_id, root.receiver_id, message.sender_id, message.receiver_id}:
         return JsonResponse({'detail': 'Forbidden'}, status=403)
 
-    tree = message.build_thread_tree()
-    return JsonResponse(tree)
+    # the cached value is the encoded JSON, so hits skip serialization entirely
+    key = thread_cache_key(root.id)
+    content = cache.get(key)
+    if content is None:
+        content = dumps_json(root.build_thread_tree())
+        cache.set(key, content, THREAD_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type='application/json')
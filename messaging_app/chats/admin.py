@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count
 from .models import User, Conversation, Message
 
 
@@ -12,6 +13,8 @@ class UserAdmin(BaseUserAdmin):
     search_fields = ('username', 'email', 'first_name', 'last_name', 'phone_number')
     ordering = ('-created_at',)
     readonly_fields = ('user_id', 'created_at', 'last_login', 'date_joined')
+    # has_conversation follows the reverse one-to-one; join it instead of querying per row
+    list_select_related = ('conversation',)
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Additional Info', {
@@ -41,9 +44,13 @@ class ConversationAdmin(admin.ModelAdmin):
     readonly_fields = ('conversation_id', 'created_at', 'updated_at')
     ordering = ('-updated_at',)
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(message_count=Count('messages'))
+    
     def get_message_count(self, obj):
-        return obj.messages.count()
+        return obj.message_count
     get_message_count.short_description = 'Message Count'
+    get_message_count.admin_order_field = 'message_count'
 
 
 @admin.register(Message)
@@ -1,13 +1,31 @@
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from .authentication import deny_token
 from .models import User
-from .serializers import UserSerializer
+from .serializers import user_to_dict
+
+
+# Fields register() cannot create a user without
+REGISTER_REQUIRED_FIELDS = ('username', 'email', 'password')
+
+
+def _taken_field(username=None, email=None, exclude=None):
+    """
+    'Username' or 'Email' if that value already belongs to another user, else
+    None; used to tell a unique-constraint failure from other IntegrityErrors
+    """
+    others = User.objects.all() if exclude is None else User.objects.exclude(pk=exclude.pk)
+    if username is not None and others.filter(username=username).exists():
+        return 'Username'
+    if email is not None and others.filter(email=email).exists():
+        return 'Email'
+    return None
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -16,13 +34,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     
     def validate(self, attrs):
+        # The parent already issues the refresh/access pair for self.user
         data = super().validate(attrs)
         
-        # Add custom claims
-        refresh = self.get_token(self.user)
-        data['refresh'] = str(refresh)
-        data['access'] = str(refresh.access_token)
-        
         # Add user data
         data['user'] = {
             'user_id': str(self.user.user_id),
@@ -52,28 +66,35 @@ def register(request):
     try:
         data = request.data
         
-        # Check if user already exists
-        if User.objects.filter(username=data.get('username')).exists():
+        missing = [field for field in REGISTER_REQUIRED_FIELDS if not data.get(field)]
+        if missing:
             return Response({
-                'error': 'Username already exists'
+                'error': f"Missing required fields: {', '.join(missing)}"
             }, status=status.HTTP_400_BAD_REQUEST)
-            
-        if User.objects.filter(email=data.get('email')).exists():
+        
+        # Create user; the unique constraints on username and email do the
+        # duplicate check, so there is no window between check and insert
+        try:
+            with transaction.atomic():
+                user = User.objects.create(
+                    username=data.get('username'),
+                    email=data.get('email'),
+                    first_name=data.get('first_name', ''),
+                    last_name=data.get('last_name', ''),
+                    phone_number=data.get('phone_number', ''),
+                    role=data.get('role', 'guest'),
+                    password=make_password(data.get('password'))
+                )
+        except IntegrityError:
+            # Only a value that really exists is a duplicate; anything else
+            # goes to the generic error below
+            taken = _taken_field(username=data.get('username'), email=data.get('email'))
+            if taken is None:
+                raise
             return Response({
-                'error': 'Email already exists'
+                'error': f'{taken} already exists'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create user
-        user = User.objects.create(
-            username=data.get('username'),
-            email=data.get('email'),
-            first_name=data.get('first_name', ''),
-            last_name=data.get('last_name', ''),
-            phone_number=data.get('phone_number', ''),
-            role=data.get('role', 'guest'),
-            password=make_password(data.get('password'))
-        )
-        
         # Generate tokens
         refresh = RefreshToken.for_user(user)
         
@@ -103,13 +124,16 @@ def register(request):
 @permission_classes([permissions.IsAuthenticated])
 def logout(request):
     """
-    Logout user by blacklisting the refresh token
+    Logout user by blacklisting the refresh token and revoking the access
+    token the request was made with
     """
     try:
         refresh_token = request.data.get('refresh_token')
         if refresh_token:
             token = RefreshToken(refresh_token)
             token.blacklist()
+        if isinstance(request.auth, Token):
+            deny_token(request.auth)
             
         return Response({
             'message': 'Logout successful'
@@ -127,8 +151,7 @@ def user_profile(request):
     """
     Get current user's profile
     """
-    serializer = UserSerializer(request.user)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(user_to_dict(request.user), status=status.HTTP_200_OK)
 
 
 @api_view(['PUT', 'PATCH'])
@@ -141,27 +164,30 @@ def update_profile(request):
         user = request.user
         data = request.data
         
-        # Update allowed fields
-        if 'first_name' in data:
-            user.first_name = data['first_name']
-        if 'last_name' in data:
-            user.last_name = data['last_name']
-        if 'phone_number' in data:
-            user.phone_number = data['phone_number']
-        if 'email' in data:
-            # Check if email is already taken by another user
-            if User.objects.filter(email=data['email']).exclude(user_id=user.user_id).exists():
+        # Update allowed fields, remembering which ones to write back
+        fields = [field for field in ('first_name', 'last_name', 'phone_number', 'email') if field in data]
+        if 'email' in fields and not data['email']:
+            return Response({
+                'error': 'Missing required fields: email'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        for field in fields:
+            setattr(user, field, data[field])
+        
+        if fields:
+            # The unique constraint on email rejects addresses taken by another user
+            try:
+                with transaction.atomic():
+                    user.save(update_fields=fields)
+            except IntegrityError:
+                if 'email' not in fields or _taken_field(email=data['email'], exclude=user) is None:
+                    raise
                 return Response({
                     'error': 'Email already exists'
                 }, status=status.HTTP_400_BAD_REQUEST)
-            user.email = data['email']
-            
-        user.save()
         
-        serializer = UserSerializer(user)
         return Response({
             'message': 'Profile updated successfully',
-            'user': serializer.data
+            'user': user_to_dict(user)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -0,0 +1,76 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+def deny_token(token):
+    """
+    Reject a token (by jti) until its own expiry. Access tokens have no
+    blacklist() of their own, so this records them in the token_blacklist
+    tables the way RefreshToken.blacklist() does; the database is shared by
+    every worker and survives restarts, and `manage.py flushexpiredtokens`
+    clears entries once the tokens have expired.
+    """
+    jti = token.get(api_settings.JTI_CLAIM)
+    exp = token.get('exp')
+    if not jti or not exp:
+        return
+    outstanding, _ = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'user_id': token.get(api_settings.USER_ID_CLAIM),
+            'token': str(token),
+            'expires_at': datetime_from_epoch(exp),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+
+
+class _UserColumns:
+    """
+    The user model as JWTAuthentication.get_user() uses it (``objects`` and
+    ``DoesNotExist``), with ``objects`` loading only the authenticator's
+    get_user_fields().
+    """
+
+    def __init__(self, model, authenticator):
+        self.model = model
+        self.authenticator = authenticator
+        self.DoesNotExist = model.DoesNotExist
+
+    @property
+    def objects(self):
+        return self.model._default_manager.only(*self.authenticator.get_user_fields())
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also rejects access tokens revoked through logout,
+    with one indexed token_blacklist lookup per request.
+
+    request.user is loaded with only the columns views, permissions and
+    UserSerializer read; the password hash, last_login and date_joined are
+    left deferred (and fetched only if something touches them).
+    """
+    user_fields = (
+        'user_id', 'username', 'email', 'first_name', 'last_name',
+        'phone_number', 'role', 'created_at', 'is_active', 'is_staff', 'is_superuser',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # JWTAuthentication.get_user() does the claim, is_active and revoke
+        # checks; it only needs to look the user up through this stand-in
+        self.user_model = _UserColumns(self.user_model, self)
+
+    def get_user_fields(self):
+        # The revoke check compares against the password hash
+        return self.user_fields + (('password',) if api_settings.CHECK_REVOKE_TOKEN else ())
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if BlacklistedToken.objects.filter(token__jti=token.get(api_settings.JTI_CLAIM)).exists():
+            raise InvalidToken('Token has been revoked')
+        return token
@@ -1,10 +1,71 @@
-import django_filters
+import copy
+import time as _time
 from django_filters import rest_framework as filters
-from django.db.models import Q
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
 from .models import Message, Conversation, User
 
 
-class MessageFilter(filters.FilterSet):
+def day_start(value):
+    """
+    Midnight of ``value`` in the current timezone. Date filters compare the
+    column against [day_start(d), day_start(d + 1 day)) instead of using
+    __date, which would wrap the column in DATE() and skip its index.
+    """
+    return datetime.combine(value, time.min, tzinfo=timezone.get_current_timezone())
+
+
+# date_range option -> (start, end) from (now, UTC midnight); end None = open-ended
+DATE_RANGES = {
+    'today': lambda now, midnight: (midnight, None),
+    'yesterday': lambda now, midnight: (midnight - timedelta(days=1), midnight),
+    'last_week': lambda now, midnight: (now - timedelta(days=7), None),
+    'last_month': lambda now, midnight: (now - timedelta(days=30), None),
+}
+
+
+@lru_cache(maxsize=128)
+def date_range_bounds(value, minute):
+    """
+    (start, end) for a DATE_RANGES option as of the given minute since the
+    epoch. Cached per minute, since the bounds only move that often.
+    """
+    now = datetime.fromtimestamp(minute * 60, tz=dt_timezone.utc)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return DATE_RANGES[value](now, midnight)
+
+
+class ShallowCopyFiltersMixin:
+    """
+    FilterSet.__init__ deep-copies every declared filter on each request. Apart
+    from the model/parent binding, the only per-instance state a filter writes
+    is its ``extra`` kwargs and the form field it caches, and a ``method``
+    filter's FilterMethod points back at its filter. A shallow copy with its
+    own ``extra``, no cached field and a rebound method will do.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        # Shadow the class-level filters so the base __init__ copies nothing
+        self.base_filters = {}
+        super().__init__(*args, **kwargs)
+        del self.base_filters
+        model = self.queryset.model
+        for name, base_filter in self.base_filters.items():
+            filter_ = copy.copy(base_filter)
+            filter_.extra = base_filter.extra.copy()
+            # Filter.field is cached from extra; let each copy build its own
+            filter_.__dict__.pop('_field', None)
+            if base_filter.method is not None:
+                # Re-setting method rebinds its FilterMethod to this copy
+                filter_.method = base_filter.method
+            filter_.model = model
+            filter_.parent = self
+            self.filters[name] = filter_
+
+
+class MessageFilter(ShallowCopyFiltersMixin, filters.FilterSet):
     """
     Filter class for Message model to retrieve messages with specific criteria
     including conversations with specific users or messages within a time range
@@ -12,7 +73,7 @@ class MessageFilter(filters.FilterSet):
     
     # Filter by conversation participant (user)
     participant = filters.ModelChoiceFilter(
-        queryset=User.objects.all(),
+        queryset=User.objects.only('user_id'),
         field_name='conversation__participants',
         help_text='Filter messages by conversation participant'
     )
@@ -26,7 +87,7 @@ class MessageFilter(filters.FilterSet):
     
     # Filter by message sender
     sender = filters.ModelChoiceFilter(
-        queryset=User.objects.all(),
+        queryset=User.objects.only('user_id'),
         field_name='sender',
         help_text='Filter messages by sender'
     )
@@ -53,7 +114,7 @@ class MessageFilter(filters.FilterSet):
     
     # Date range filter
     sent_date = filters.DateFilter(
-        field_name='sent_at__date',
+        method='filter_sent_date',
         help_text='Filter messages sent on specific date (YYYY-MM-DD)'
     )
     
@@ -88,6 +149,13 @@ class MessageFilter(filters.FilterSet):
         help_text='Filter messages by conversation ID'
     )
     
+    # Same filter under the ?conversation= name the message endpoints accept;
+    # compares the FK column directly
+    conversation = filters.UUIDFilter(
+        field_name='conversation_id',
+        help_text='Filter messages by conversation ID'
+    )
+    
     def filter_deleted_messages(self, queryset, name, value):
         """
         Custom filter method to include/exclude deleted messages
@@ -97,31 +165,24 @@ class MessageFilter(filters.FilterSet):
             return queryset.filter(is_deleted=False)
         return queryset
     
+    def filter_sent_date(self, queryset, name, value):
+        """
+        Messages sent on the given day, as a half-open range on sent_at
+        """
+        start = day_start(value)
+        return queryset.filter(sent_at__gte=start, sent_at__lt=start + timedelta(days=1))
+    
     def filter_date_range(self, queryset, name, value):
         """
         Custom filter method for predefined date ranges
         """
-        from datetime import datetime, timedelta
-        from django.utils import timezone
-        
-        now = timezone.now()
-        
-        if value == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            return queryset.filter(sent_at__gte=start_date)
-        elif value == 'yesterday':
-            yesterday = now - timedelta(days=1)
-            start_date = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
-            return queryset.filter(sent_at__gte=start_date, sent_at__lt=end_date)
-        elif value == 'last_week':
-            start_date = now - timedelta(days=7)
+        # Unknown options are ignored (and never reach the cache)
+        if value not in DATE_RANGES:
+            return queryset
+        start_date, end_date = date_range_bounds(value, int(_time.time() // 60))
+        if end_date is None:
             return queryset.filter(sent_at__gte=start_date)
-        elif value == 'last_month':
-            start_date = now - timedelta(days=30)
-            return queryset.filter(sent_at__gte=start_date)
-        
-        return queryset
+        return queryset.filter(sent_at__gte=start_date, sent_at__lt=end_date)
     
     class Meta:
         model = Message
@@ -133,14 +194,14 @@ class MessageFilter(filters.FilterSet):
         }
 
 
-class ConversationFilter(filters.FilterSet):
+class ConversationFilter(ShallowCopyFiltersMixin, filters.FilterSet):
     """
     Filter class for Conversation model
     """
     
     # Filter by participant
     participant = filters.ModelChoiceFilter(
-        queryset=User.objects.all(),
+        queryset=User.objects.only('user_id'),
         field_name='participants',
         help_text='Filter conversations by participant'
     )
@@ -189,10 +250,12 @@ class ConversationFilter(filters.FilterSet):
         """
         Filter conversations based on whether they have messages
         """
-        if value:
-            return queryset.filter(messages__isnull=False).distinct()
-        else:
-            return queryset.filter(messages__isnull=True)
+        # Reuse the viewset's msg_count annotation when present
+        if 'msg_count' in queryset.query.annotations:
+            return queryset.filter(msg_count__gt=0) if value else queryset.filter(msg_count=0)
+        # EXISTS subquery instead of a JOIN + DISTINCT over every message row
+        has_message = Exists(Message.objects.filter(conversation=OuterRef('pk')))
+        return queryset.filter(has_message if value else ~has_message)
     
     class Meta:
         model = Conversation
@@ -202,7 +265,7 @@ class ConversationFilter(filters.FilterSet):
         }
 
 
-class UserFilter(filters.FilterSet):
+class UserFilter(ShallowCopyFiltersMixin, filters.FilterSet):
     """
     Filter class for User model (for admin/staff use)
     """
@@ -221,14 +284,12 @@ class UserFilter(filters.FilterSet):
     
     # Filter by registration date
     registered_after = filters.DateFilter(
-        field_name='created_at__date',
-        lookup_expr='gte',
+        method='filter_registered_after',
         help_text='Filter users registered after this date'
     )
     
     registered_before = filters.DateFilter(
-        field_name='created_at__date',
-        lookup_expr='lte',
+        method='filter_registered_before',
         help_text='Filter users registered before this date'
     )
     
@@ -240,6 +301,18 @@ class UserFilter(filters.FilterSet):
             Q(first_name__icontains=value) | Q(last_name__icontains=value)
         )
     
+    def filter_registered_after(self, queryset, name, value):
+        """
+        Users registered on or after the given day
+        """
+        return queryset.filter(created_at__gte=day_start(value))
+    
+    def filter_registered_before(self, queryset, name, value):
+        """
+        Users registered on or before the given day
+        """
+        return queryset.filter(created_at__lt=day_start(value + timedelta(days=1)))
+    
     class Meta:
         model = User
         fields = {
@@ -0,0 +1,11 @@
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with the OWASP-recommended cost (m=46 MiB, t=2, p=1).
+    Hashes made with other Argon2 parameters are upgraded on the next login.
+    """
+    time_cost = 2
+    memory_cost = 47104  # KiB
+    parallelism = 1
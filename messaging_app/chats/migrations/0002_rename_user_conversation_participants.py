@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-14 06:53
+#
+# Catches the migrations up with models.py as it already stood before the
+# duplicate primary-key indexes were dropped: the Conversation.user ->
+# participants rename (and its index), and User.password being redeclared
+# without AbstractUser's verbose_name. It is separate from 0003 so that one
+# only drops indexes.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chats_conve_user_id_35d860_idx',
+        ),
+        migrations.RenameField(
+            model_name='conversation',
+            old_name='user',
+            new_name='participants',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['participants'], name='chats_conve_partici_8c96cd_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-14 06:53
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_rename_user_conversation_participants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chats_conve_convers_ca5956_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chats_messa_message_a35d94_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='chats_user_user_id_90bd3c_idx',
+        ),
+        migrations.AlterField(
+            model_name='conversation',
+            name='conversation_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='message_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
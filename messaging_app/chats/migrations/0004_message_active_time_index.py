@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_drop_redundant_pk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'is_deleted', '-sent_at'], name='msg_conv_active_time'),
+        ),
+    ]
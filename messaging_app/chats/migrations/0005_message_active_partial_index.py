@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0004_message_active_time_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='msg_conv_active_time',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['conversation', '-sent_at'], name='msg_active_idx'),
+        ),
+    ]
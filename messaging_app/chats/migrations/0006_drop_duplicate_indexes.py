@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_message_active_partial_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chats_conve_created_5c8beb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='chats_conve_partici_8c96cd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chats_messa_sender__411bbf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chats_messa_convers_93703a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='chats_messa_sent_at_6f1b88_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='chats_user_email_1b3736_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='chats_user_created_6833ca_idx',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+    ]
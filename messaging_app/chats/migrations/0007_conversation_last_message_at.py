@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_message_at(apps, schema_editor):
+    """Set last_message_at from each conversation's newest message."""
+    Conversation = apps.get_model('chats', 'Conversation')
+    Message = apps.get_model('chats', 'Message')
+    newest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-sent_at').values('sent_at')[:1]
+    Conversation.objects.update(last_message_at=Subquery(newest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_drop_duplicate_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='conversation',
+            options={'ordering': ['-last_message_at']},
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_last_message_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0007_conversation_last_message_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='msg_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['conversation', '-sent_at', '-message_id'], name='msg_active_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0008_message_active_index_cursor_key'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='conversation',
+            options={'ordering': [models.OrderBy(models.F('last_message_at'), descending=True, nulls_last=True), '-updated_at']},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-14 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0009_conversation_ordering_nulls_last'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='msg_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'is_deleted', '-sent_at', '-message_id'], name='msg_active_idx'),
+        ),
+    ]
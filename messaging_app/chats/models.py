@@ -16,20 +16,19 @@ class User(AbstractUser):
         ('admin', 'Admin'),
     ]
     
-    # Use UUID as primary key
+    # Use UUID as primary key (the PK constraint already provides its index)
     user_id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
     
     # Override first_name and last_name to make them required
     first_name = models.CharField(max_length=150, null=False, blank=False)
     last_name = models.CharField(max_length=150, null=False, blank=False)
     
-    # Email field (already unique in AbstractUser, but ensuring it's required)
-    email = models.EmailField(unique=True, null=False, blank=False, db_index=True)
+    # Email field (unique, which already gives it an index; required)
+    email = models.EmailField(unique=True, null=False, blank=False)
     
     # Additional fields
     phone_number = models.CharField(
@@ -66,16 +65,26 @@ class User(AbstractUser):
     
     class Meta:
         db_table = 'chats_user'
-        indexes = [
-            models.Index(fields=['email']),
-            models.Index(fields=['user_id']),
-            models.Index(fields=['created_at']),
-        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
 
+# Most recent activity first. Conversations without messages have no
+# last_message_at and go last on every backend (PostgreSQL would put NULLs
+# first under DESC), in the order they were last updated.
+CONVERSATION_ORDERING = [models.F('last_message_at').desc(nulls_last=True), '-updated_at']
+
+
+class ConversationQuerySet(models.QuerySet):
+    
+    def for_participant(self, user):
+        """Conversations the user may access: all for staff, otherwise their own"""
+        if user.is_staff or user.is_superuser:
+            return self.all()
+        return self.filter(participants=user)
+
+
 class Conversation(models.Model):
     """
     Model representing a conversation for a single user with the system.
@@ -85,33 +94,54 @@ class Conversation(models.Model):
     conversation_id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
     
     participants = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
-        related_name='conversation',
-        db_index=True
+        related_name='conversation'
     )
     
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # sent_at of the newest message, kept current by chats.signals
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    
+    objects = ConversationQuerySet.as_manager()
     
     class Meta:
         db_table = 'chats_conversation'
-        indexes = [
-            models.Index(fields=['conversation_id']),
-            models.Index(fields=['participants']),
-            models.Index(fields=['created_at']),
-        ]
-        ordering = ['-updated_at']
+        ordering = CONVERSATION_ORDERING
     
     def __str__(self):
         return f"Conversation for {self.participants.username}"
 
 
+class MessageManager(models.Manager):
+    """
+    One place for how message listings load their relations: MessageSerializer
+    renders the sender and the conversation id, so both FKs come in the same query.
+    Only the joined columns that are actually read are selected.
+    """
+    
+    def with_related(self):
+        return self.select_related('sender', 'conversation').only(
+            'message_id', 'sender', 'conversation', 'message_body',
+            'sent_at', 'edited_at', 'is_deleted', 'is_from_system',
+            # sender_summary, and the participant check on the conversation
+            'sender__user_id', 'sender__username', 'sender__email',
+            'conversation__conversation_id', 'conversation__participants',
+        )
+    
+    def for_participant(self, user):
+        """Messages the user may read: all for staff, otherwise their conversation's"""
+        queryset = self.with_related()
+        if user.is_staff or user.is_superuser:
+            return queryset
+        return queryset.filter(conversation__participants=user)
+
+
 class Message(models.Model):
     """
     Model representing a message in a user's conversation with the system.
@@ -121,8 +151,7 @@ class Message(models.Model):
     message_id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
     
     sender = models.ForeignKey(
@@ -148,14 +177,20 @@ class Message(models.Model):
     # Flag to distinguish between user and system messages
     is_from_system = models.BooleanField(default=False)
     
+    objects = MessageManager()
+    
     class Meta:
         db_table = 'chats_message'
         indexes = [
-            models.Index(fields=['message_id']),
-            models.Index(fields=['sender']),
-            models.Index(fields=['conversation']),
-            models.Index(fields=['sent_at']),
             models.Index(fields=['conversation', 'sent_at']),
+            # Default listing path: live messages of one conversation, newest first;
+            # message_id matches the cursor pagination tiebreak. is_deleted is a key
+            # column rather than a partial-index condition, which MySQL does not
+            # support (Django skips such indexes there with models.W037).
+            models.Index(
+                fields=['conversation', 'is_deleted', '-sent_at', '-message_id'],
+                name='msg_active_idx',
+            ),
             models.Index(fields=['is_from_system']),
         ]
         ordering = ['-sent_at']
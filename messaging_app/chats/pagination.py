@@ -1,12 +1,71 @@
-from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination, LimitOffsetPagination
 from rest_framework.response import Response
-from collections import OrderedDict
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips SELECT COUNT(*) on large unfiltered tables.
+    On PostgreSQL an unfiltered queryset is counted from the planner's
+    pg_class.reltuples estimate; anything filtered, small or on another
+    backend still gets an exact count.
+
+    The estimate can be off either way, so a page that turns out short or
+    lies past the estimate corrects the count instead of serving a wrong
+    total or a 404 for rows that exist.
+    """
+    # Below this many rows an exact count is cheap and the estimate too coarse
+    estimate_threshold = 100000
+    estimated = False
+
+    def page(self, number):
+        try:
+            page = super().page(number)
+        except EmptyPage:
+            if not self.estimated:
+                raise
+            self._set_count(super().count)
+            return super().page(number)
+        if self.estimated and len(page.object_list) < self.per_page:
+            if not page.object_list:
+                # Past the real data; let the exact count decide
+                self._set_count(super().count)
+                return super().page(number)
+            # A short page is the real last one, so the total is known
+            self._set_count((page.number - 1) * self.per_page + len(page.object_list))
+        return page
+
+    def _set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        self.estimated = False
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where:
+            connection = connections[qs.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                        [qs.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= self.estimate_threshold:
+                    self.estimated = True
+                    return row[0]
+        return super().count
 
 
 class MessagePagination(PageNumberPagination):
     """
     Custom pagination class for messages with 20 items per page
     """
+    django_paginator_class = EstimatedCountPaginator
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -16,15 +75,15 @@ class MessagePagination(PageNumberPagination):
         """
         Custom paginated response with additional metadata
         """
-        return Response(OrderedDict([
-            ('count', self.page.paginator.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.page_size),
-            ('results', data)
-        ]))
+        return Response({
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'total_pages': self.page.paginator.num_pages,
+            'current_page': self.page.number,
+            'page_size': self.page_size,
+            'results': data
+        })
 
 
 class ConversationPagination(PageNumberPagination):
@@ -40,15 +99,15 @@ class ConversationPagination(PageNumberPagination):
         """
         Custom paginated response with additional metadata
         """
-        return Response(OrderedDict([
-            ('count', self.page.paginator.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.page_size),
-            ('results', data)
-        ]))
+        return Response({
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'total_pages': self.page.paginator.num_pages,
+            'current_page': self.page.number,
+            'page_size': self.page_size,
+            'results': data
+        })
 
 
 class StandardResultsPagination(PageNumberPagination):
@@ -65,6 +124,7 @@ class LargeResultsPagination(PageNumberPagination):
     """
     Pagination class for large result sets
     """
+    django_paginator_class = EstimatedCountPaginator
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 200
@@ -94,14 +154,26 @@ class MessageLimitOffsetPagination(LimitOffsetPagination):
         """
         Custom paginated response with additional metadata
         """
-        return Response(OrderedDict([
-            ('count', self.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('limit', self.limit),
-            ('offset', self.offset),
-            ('results', data)
-        ]))
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'limit': self.limit,
+            'offset': self.offset,
+            'results': data
+        })
+
+
+class MessageCursorPagination(CursorPagination):
+    """
+    Keyset pagination for infinite-scroll message feeds: each page continues
+    from the last (sent_at, message_id) seen instead of skipping OFFSET rows
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-sent_at', '-message_id')
 
 
 class CustomMessagePagination(PageNumberPagination):
@@ -118,17 +190,17 @@ class CustomMessagePagination(PageNumberPagination):
         Enhanced paginated response with message-specific metadata
         """
         # Calculate additional statistics if needed
-        response_data = OrderedDict([
-            ('count', self.page.paginator.count),
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('total_pages', self.page.paginator.num_pages),
-            ('current_page', self.page.number),
-            ('page_size', self.get_page_size(self.request)),
-            ('has_next', self.page.has_next()),
-            ('has_previous', self.page.has_previous()),
-            ('results', data)
-        ])
+        response_data = {
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'total_pages': self.page.paginator.num_pages,
+            'current_page': self.page.number,
+            'page_size': self.get_page_size(self.request),
+            'has_next': self.page.has_next(),
+            'has_previous': self.page.has_previous(),
+            'results': data
+        }
         
         # Add conversation context if available
         if hasattr(self, 'conversation_id'):
@@ -1,5 +1,43 @@
+import uuid
+
+from django.core.cache import cache
 from rest_framework import permissions
 
+from .models import Conversation, Message
+
+# Hash lookup for the per-object method checks
+_SAFE_METHODS = frozenset(permissions.SAFE_METHODS)
+
+# How long a conversation's participant id is remembered; chats.signals also
+# drops the entry whenever the conversation is saved or deleted
+PARTICIPANT_CACHE_TIMEOUT = 30
+
+
+def participant_cache_key(conversation_id):
+    return f'perm:conv:{conversation_id}'
+
+
+def is_participant(user, obj):
+    """
+    True if ``user`` is the participant of ``obj`` (a Conversation, or a
+    Message through its conversation). Compares ids, so no user row is
+    loaded; a message whose conversation is not already loaded has the
+    participant id looked up through the cache instead of a query per check.
+    """
+    if isinstance(obj, Conversation):
+        return obj.participants_id == user.pk
+    if not isinstance(obj, Message):
+        return False
+    if Message.conversation.is_cached(obj):
+        return obj.conversation.participants_id == user.pk
+    participant_id = cache.get_or_set(
+        participant_cache_key(obj.conversation_id),
+        lambda: Conversation.objects.filter(pk=obj.conversation_id)
+        .values_list('participants_id', flat=True).first(),
+        PARTICIPANT_CACHE_TIMEOUT,
+    )
+    return participant_id == user.pk
+
 
 class IsParticipantOfConversation(permissions.BasePermission):
     """
@@ -19,19 +57,13 @@ class IsParticipantOfConversation(permissions.BasePermission):
         Object-level permission to only allow participants of a conversation 
         to access its messages.
         """
+        user = request.user
         # Staff and superusers have full access
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
-        # For Message objects, check if user is the conversation participant
-        if hasattr(obj, 'conversation'):
-            return obj.conversation.participants == request.user
-        
-        # For Conversation objects, check if user is the participant
-        if hasattr(obj, 'participants'):
-            return obj.participants == request.user
-        
-        return False
+        # Message objects through their conversation, Conversation objects directly
+        return is_participant(user, obj)
     
     def get_queryset_filter(self, request, view):
         """
@@ -42,31 +74,8 @@ class IsParticipantOfConversation(permissions.BasePermission):
         return {'participants': request.user} if hasattr(view, 'get_queryset') else {}
 
 
-class IsAuthenticatedAndParticipant(permissions.BasePermission):
-    """
-    Permission that requires authentication and ensures users can only 
-    access conversations and messages they are participants in.
-    """
-    
-    def has_permission(self, request, view):
-        """Only allow authenticated users"""
-        return request.user and request.user.is_authenticated
-    
-    def has_object_permission(self, request, view, obj):
-        """Check if user is participant of the conversation"""
-        # Staff and superusers have full access
-        if request.user.is_staff or request.user.is_superuser:
-            return True
-        
-        # For Message objects
-        if hasattr(obj, 'conversation'):
-            return obj.conversation.participants == request.user
-        
-        # For Conversation objects  
-        if hasattr(obj, 'participants'):
-            return obj.participants == request.user
-        
-        return False
+# Same checks as IsParticipantOfConversation; kept as a name for existing imports
+IsAuthenticatedAndParticipant = IsParticipantOfConversation
 
 
 class CanManageOwnMessages(permissions.BasePermission):
@@ -85,22 +94,21 @@ class CanManageOwnMessages(permissions.BasePermission):
         - View messages in conversations they participate in
         - Edit/Delete only their own messages
         """
+        user = request.user
         # Staff and superusers have full access
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
         # Check if user is participant in the conversation
-        is_participant = obj.conversation.participants == request.user
-        
-        if not is_participant:
+        if not is_participant(user, obj):
             return False
         
         # For safe methods (GET, HEAD, OPTIONS), allow if user is participant
-        if request.method in permissions.SAFE_METHODS:
+        if request.method in _SAFE_METHODS:
             return True
         
         # For unsafe methods (PUT, PATCH, DELETE), only allow message owner
-        return obj.sender == request.user
+        return obj.sender_id == user.pk
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -111,7 +119,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Read permissions are allowed for any request,
         # so we'll always allow GET, HEAD or OPTIONS requests.
-        if request.method in permissions.SAFE_METHODS:
+        if request.method in _SAFE_METHODS:
             return True
 
         # Write permissions are only allowed to the owner of the object.
@@ -128,12 +136,13 @@ class IsOwnerOfConversation(permissions.BasePermission):
         return request.user and request.user.is_authenticated
     
     def has_object_permission(self, request, view, obj):
+        user = request.user
         # Staff and superusers can access any conversation
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
         # Regular users can only access their own conversation
-        return obj.participants == request.user
+        return is_participant(user, obj)
 
 
 class IsMessageOwnerOrConversationParticipant(permissions.BasePermission):
@@ -149,17 +158,18 @@ class IsMessageOwnerOrConversationParticipant(permissions.BasePermission):
         return request.user and request.user.is_authenticated
     
     def has_object_permission(self, request, view, obj):
+        user = request.user
         # Staff and superusers can access any message
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
         # Message sender can modify their own messages
-        if obj.sender == request.user:
+        if obj.sender_id == user.pk:
             return True
         
         # Conversation participant can view messages in their conversation
-        if request.method in permissions.SAFE_METHODS:
-            return obj.conversation.participants == request.user
+        if request.method in _SAFE_METHODS:
+            return is_participant(user, obj)
         
         return False
 
@@ -174,12 +184,13 @@ class IsAdminOrSelf(permissions.BasePermission):
         return request.user and request.user.is_authenticated
     
     def has_object_permission(self, request, view, obj):
+        user = request.user
         # Staff and superusers can access any user
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
             
         # Users can only access their own profile
-        return obj == request.user
+        return obj == user
 
 
 class IsOwnerOfMessage(permissions.BasePermission):
@@ -191,16 +202,17 @@ class IsOwnerOfMessage(permissions.BasePermission):
         return request.user and request.user.is_authenticated
     
     def has_object_permission(self, request, view, obj):
+        user = request.user
         # Staff and superusers have full access
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
         # For safe methods (GET, HEAD, OPTIONS), allow if user is conversation participant
-        if request.method in permissions.SAFE_METHODS:
-            return obj.conversation.participants == request.user
+        if request.method in _SAFE_METHODS:
+            return is_participant(user, obj)
         
         # For unsafe methods (POST, PUT, PATCH, DELETE), only allow message owner
-        return obj.sender == request.user
+        return obj.sender_id == user.pk
 
 
 class CanCreateConversation(permissions.BasePermission):
@@ -210,17 +222,21 @@ class CanCreateConversation(permissions.BasePermission):
     """
     
     def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
+        user = request.user
+        if not (user and user.is_authenticated):
             return False
         
         # Allow staff/admin to create conversations for anyone
-        if request.user.is_staff or request.user.is_superuser:
+        if user.is_staff or user.is_superuser:
             return True
         
         # For regular users, check if they're trying to create for themselves
         if request.method == 'POST':
             participants_id = request.data.get('participants_id')
-            if participants_id and str(participants_id) != str(request.user.user_id):
-                return False
+            if participants_id:
+                # Compare UUIDs directly; only a submitted string needs the str() form
+                if isinstance(participants_id, uuid.UUID):
+                    return participants_id == user.user_id
+                return str(participants_id) == str(user.user_id)
         
         return True
\ No newline at end of file
@@ -1,3 +1,4 @@
+from django.db import models
 from rest_framework import serializers
 from .models import User, Conversation, Message
 
@@ -34,10 +35,90 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+# Renders datetimes exactly as UserSerializer's created_at field would
+_datetime_field = serializers.DateTimeField()
+
+
+def user_to_dict(user):
+    """UserSerializer's read shape as a plain dict, for the profile endpoints."""
+    return {
+        'user_id': str(user.user_id),
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'phone_number': user.phone_number,
+        'role': user.role,
+        'created_at': _datetime_field.to_representation(user.created_at),
+    }
+
+
+# Columns message_row_to_dict reads, for Message querysets turned into .values()
+MESSAGE_ROW_FIELDS = (
+    'message_id', 'sender_id', 'sender__username', 'sender__email', 'conversation_id',
+    'message_body', 'sent_at', 'edited_at', 'is_deleted', 'is_from_system',
+)
+
+
+def message_row_to_dict(row):
+    """MessageSerializer's read shape built from a values(*MESSAGE_ROW_FIELDS) row."""
+    return {
+        'message_id': str(row['message_id']),
+        'sender': {
+            'user_id': str(row['sender_id']),
+            'username': row['sender__username'],
+            'email': row['sender__email'],
+        },
+        'conversation': row['conversation_id'],
+        'message_body': row['message_body'],
+        'sent_at': _datetime_field.to_representation(row['sent_at']),
+        'edited_at': _datetime_field.to_representation(row['edited_at']),
+        'is_deleted': row['is_deleted'],
+        'is_from_system': row['is_from_system'],
+    }
+
+
+def sender_summary(user):
+    """Flat sender payload embedded in each serialized message."""
+    return {'user_id': str(user.pk), 'username': user.username, 'email': user.email}
+
+
+class MessageListSerializer(serializers.ListSerializer):
+    """Builds each distinct sender's payload once for the whole list.
+
+    Senders already loaded via select_related are reused; any others are
+    fetched in a single query. MessageSerializer.get_sender reads the
+    resulting map from its parent instead of rendering the sender per row.
+    """
+
+    def to_representation(self, data):
+        messages = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        senders = {}
+        missing = set()
+        for message in messages:
+            if Message.sender.is_cached(message):
+                senders[message.sender_id] = message.sender
+            else:
+                missing.add(message.sender_id)
+        missing.difference_update(senders)
+        if missing:
+            senders.update(
+                (user.pk, user)
+                for user in User.objects.filter(pk__in=missing).only('user_id', 'username', 'email')
+            )
+        self._user_map = {pk: sender_summary(user) for pk, user in senders.items()}
+        try:
+            return [self.child.to_representation(message) for message in messages]
+        finally:
+            del self._user_map
+
+
 class MessageSerializer(serializers.ModelSerializer):
-    sender = UserSerializer(read_only=True)
+    sender = serializers.SerializerMethodField()
+    # Optional: create() falls back to request.user, which is already loaded
     sender_id = serializers.PrimaryKeyRelatedField(
-        write_only=True, source='sender', queryset=User.objects.all(), allow_null=False
+        write_only=True, source='sender', queryset=User.objects.all(), allow_null=False,
+        required=False,
     )
 
     class Meta:
@@ -47,6 +128,20 @@ class MessageSerializer(serializers.ModelSerializer):
             'sent_at', 'edited_at', 'is_deleted', 'is_from_system',
         )
         read_only_fields = ('message_id', 'sent_at', 'edited_at')
+        # MessageViewSet.create defaults the conversation to the sender's own
+        extra_kwargs = {
+            'conversation': {
+                'required': False,
+                'error_messages': {'does_not_exist': 'Conversation not found.'},
+            },
+        }
+        list_serializer_class = MessageListSerializer
+
+    def get_sender(self, obj):
+        user_map = getattr(self.parent, '_user_map', None)
+        if user_map is not None:
+            return user_map[obj.sender_id]
+        return sender_summary(obj.sender)
 
     def create(self, validated_data):
         # If sender was not provided via sender_id, try to use the authenticated user
@@ -60,11 +155,24 @@ class MessageSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MessageReadSerializer(MessageSerializer):
+    """MessageSerializer for responses only: no write-only sender_id, nothing writable."""
+
+    class Meta(MessageSerializer.Meta):
+        fields = (
+            'message_id', 'sender', 'conversation', 'message_body',
+            'sent_at', 'edited_at', 'is_deleted', 'is_from_system',
+        )
+        read_only_fields = fields
+
+
 class ConversationSerializer(serializers.ModelSerializer):
     # `participants` is a OneToOneField to User in the models; expose nested user info
     participants = UserSerializer(read_only=True)
+    # Optional: create() falls back to request.user, as MessageSerializer does for sender_id
     participants_id = serializers.PrimaryKeyRelatedField(
-        write_only=True, source='participants', queryset=User.objects.all(), allow_null=False
+        write_only=True, source='participants', queryset=User.objects.all(), allow_null=False,
+        required=False,
     )
 
     # Nested messages
@@ -77,13 +185,19 @@ class ConversationSerializer(serializers.ModelSerializer):
         model = Conversation
         fields = (
             'conversation_id', 'participants', 'participants_id',
-            'created_at', 'updated_at', 'messages',
+            'created_at', 'updated_at', 'last_message_at', 'messages',
+            'message_count', 'last_message_preview',
         )
-        read_only_fields = ('conversation_id', 'created_at', 'updated_at')
+        read_only_fields = ('conversation_id', 'created_at', 'updated_at', 'last_message_at')
 
     def create(self, validated_data):
-        # participants already set via participants_id -> participants
+        # participants set via participants_id -> participants, or else the requester
         participants = validated_data.get('participants')
+        if participants is None:
+            request = self.context.get('request')
+            if request is None or request.user.is_anonymous:
+                raise serializers.ValidationError({'participants_id': 'This field is required.'})
+            participants = validated_data['participants'] = request.user
         # Prevent creating a second conversation for the same user
         if participants and Conversation.objects.filter(participants=participants).exists():
             raise serializers.ValidationError({'participants': 'User already has a conversation.'})
@@ -92,13 +206,18 @@ class ConversationSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         return super().update(instance, validated_data)
 
+    # Both helpers read obj.messages.all() so they reuse the viewset's prefetch
+    # (already ordered by -sent_at) instead of issuing a query per conversation.
     def get_message_count(self, obj):
-        return obj.messages.count()
+        if hasattr(obj, 'msg_count'):
+            return obj.msg_count
+        return len(obj.messages.all())
 
     def get_last_message_preview(self, obj):
-        last = obj.messages.order_by('-sent_at').first()
-        if not last:
+        messages = obj.messages.all()
+        if not messages:
             return None
+        last = messages[0]
         preview = last.message_body[:100]
         return {
             'message_id': last.message_id,
@@ -106,3 +225,17 @@ class ConversationSerializer(serializers.ModelSerializer):
             'preview': preview,
             'sent_at': last.sent_at,
         }
+
+
+class ConversationReadSerializer(ConversationSerializer):
+    """ConversationSerializer for responses only, nesting MessageReadSerializer."""
+
+    messages = MessageReadSerializer(many=True, read_only=True)
+
+    class Meta(ConversationSerializer.Meta):
+        fields = (
+            'conversation_id', 'participants',
+            'created_at', 'updated_at', 'last_message_at', 'messages',
+            'message_count', 'last_message_preview',
+        )
+        read_only_fields = fields
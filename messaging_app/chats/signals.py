@@ -0,0 +1,23 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Conversation, Message
+from .permissions import participant_cache_key
+
+
+@receiver(post_save, sender=Message)
+def update_last_message_at(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep Conversation.last_message_at in step with new messages so recent-first
+    conversation lists sort on an indexed column instead of Max(sent_at)
+    """
+    if not created or raw:
+        return
+    Conversation.objects.filter(pk=instance.conversation_id).update(last_message_at=instance.sent_at)
+
+
+@receiver([post_save, post_delete], sender=Conversation)
+def invalidate_participant_cache(sender, instance, **kwargs):
+    """Forget the cached participant id when a conversation changes or goes away"""
+    cache.delete(participant_cache_key(instance.pk))
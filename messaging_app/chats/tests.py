@@ -1,3 +1,324 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import RevocableJWTAuthentication
+from .filters import ConversationFilter, MessageFilter
+from .models import Conversation, Message, User
+from .pagination import EstimatedCountPaginator
+from .permissions import is_participant, participant_cache_key
+from .serializers import MESSAGE_ROW_FIELDS, MessageReadSerializer, message_row_to_dict
+
+
+class PasswordHasherTests(TestCase):
+    def test_new_passwords_use_tuned_argon2id(self):
+        encoded = make_password('s3cret-pass')
+        self.assertTrue(encoded.startswith('argon2$argon2id$v=19$m=47104,t=2,p=1$'))
+        self.assertTrue(check_password('s3cret-pass', encoded))
+        self.assertFalse(check_password('wrong-pass', encoded))
+
+    def test_pbkdf2_password_is_upgraded_on_login(self):
+        user = User.objects.create(username='alice', email='alice@example.com')
+        user.password = make_password('s3cret-pass', hasher='pbkdf2_sha256')
+        user.save()
+        self.assertTrue(user.check_password('s3cret-pass'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$argon2id$'))
+
+
+class ConversationOrderingTests(TestCase):
+    def test_conversations_without_messages_sort_last(self):
+        users = [
+            User.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('alice', 'bob', 'carol')
+        ]
+        empty_old, active, empty_new = (Conversation.objects.create(participants=user) for user in users)
+        Message.objects.create(sender=users[1], conversation=active, message_body='hi')
+        empty_new.save()
+        self.assertEqual(list(Conversation.objects.all()), [active, empty_new, empty_old])
+
+
+class ShallowCopyFiltersTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        conversation = Conversation.objects.create(participants=self.alice)
+        for sender in (self.alice, self.bob, self.alice):
+            Message.objects.create(sender=sender, conversation=conversation, message_body='hi')
+
+    def test_filtersets_never_share_or_mutate_filters(self):
+        base_filters = dict(MessageFilter.base_filters)
+        base_state = {name: (vars(f).copy(), f.extra.copy()) for name, f in base_filters.items()}
+
+        first = MessageFilter(data={}, queryset=Message.objects.all())
+        second = MessageFilter(data={}, queryset=Message.objects.all())
+        self.assertEqual(first.filters.keys(), base_filters.keys())
+        for name, base_filter in base_filters.items():
+            self.assertIsNot(first.filters[name], base_filter)
+            self.assertIsNot(first.filters[name], second.filters[name])
+            self.assertIsNot(first.filters[name].extra, second.filters[name].extra)
+            self.assertIs(first.filters[name].parent, first)
+            self.assertIs(first.filters[name].model, Message)
+
+        first.filters['sender'].extra['help_text'] = 'changed'
+        self.assertNotEqual(second.filters['sender'].extra['help_text'], 'changed')
+        self.assertEqual(MessageFilter.base_filters, base_filters)
+        for name, base_filter in base_filters.items():
+            self.assertEqual((vars(base_filter), base_filter.extra), base_state[name])
+
+    def test_cached_form_field_is_not_shared(self):
+        base_filter = ConversationFilter.base_filters['participant']
+        base_field = base_filter.field
+        self.addCleanup(vars(base_filter).pop, '_field', None)
+        filterset = ConversationFilter(data={}, queryset=Conversation.objects.all())
+        self.assertIsNot(filterset.filters['participant'].field, base_field)
+
+    def test_filters_still_apply(self):
+        filterset = MessageFilter(data={'sender': str(self.alice.pk)}, queryset=Message.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        self.assertEqual(
+            set(filterset.qs.values_list('pk', flat=True)),
+            set(Message.objects.filter(sender=self.alice).values_list('pk', flat=True)),
+        )
+
+    def test_method_filters_call_their_own_filterset(self):
+        Message.objects.filter(sender=self.bob).update(is_deleted=True)
+        filterset = MessageFilter(data={'include_deleted': 'false'}, queryset=Message.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        self.assertEqual(filterset.qs.count(), 2)
+
+
+class RegisterAndProfileTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create_user(
+            username='alice', email='alice@example.com', password='s3cret-pass',
+            first_name='Alice', last_name='A',
+        )
+
+    def register(self, **overrides):
+        data = {'username': 'bob', 'email': 'bob@example.com', 'password': 's3cret-pass',
+                'first_name': 'Bob', 'last_name': 'B'}
+        data.update(overrides)
+        data = {key: value for key, value in data.items() if value is not None}
+        return self.client.post('/api/auth/register/', data, format='json')
+
+    def test_missing_required_field_is_not_reported_as_duplicate(self):
+        response = self.register(email=None)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Missing required fields: email')
+
+    def test_duplicate_username_and_email(self):
+        response = self.register(username='alice')
+        self.assertEqual(response.json()['error'], 'Username already exists')
+        response = self.register(email='alice@example.com')
+        self.assertEqual(response.json()['error'], 'Email already exists')
+        self.assertEqual(self.register().status_code, 201)
+
+    def test_profile_email_update(self):
+        self.register()
+        self.client.force_authenticate(self.alice)
+        response = self.client.patch('/api/auth/profile/update/', {'email': 'bob@example.com'}, format='json')
+        self.assertEqual(response.json()['error'], 'Email already exists')
+        response = self.client.patch('/api/auth/profile/update/', {'email': ''}, format='json')
+        self.assertEqual(response.json()['error'], 'Missing required fields: email')
+
+
+class SoftDeletedMessageListingTests(TestCase):
+    LISTINGS = (
+        '/api/messages/', '/api/messages/summary/', '/api/messages/feed/',
+        '/api/messages/my_messages/', '/api/messages/recent_messages/',
+        '/api/messages/search_messages/',
+    )
+
+    def setUp(self):
+        # MessageViewSet.list is cached per URL
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        conversation = Conversation.objects.create(participants=self.alice)
+        Message.objects.create(sender=self.alice, conversation=conversation, message_body='live')
+        Message.objects.create(sender=self.alice, conversation=conversation, message_body='gone', is_deleted=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def bodies(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return {row['message_body'] for row in response.json()['results']}
+
+    def test_every_listing_hides_deleted_messages_by_default(self):
+        for url in self.LISTINGS:
+            self.assertEqual(self.bodies(url), {'live'}, url)
+
+    def test_every_listing_includes_them_on_request(self):
+        for url in self.LISTINGS:
+            self.assertEqual(self.bodies(url + '?include_deleted=true'), {'live', 'gone'}, url)
+
+
+class LogoutRevocationTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='alice', email='alice@example.com', password='s3cret-pass',
+            first_name='Alice', last_name='A',
+        )
+        self.client = APIClient()
+        tokens = self.client.post(
+            '/api/auth/login/', {'username': 'alice', 'password': 's3cret-pass'}, format='json'
+        ).json()
+        self.refresh = tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_logged_out_access_token_is_rejected(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        response = self.client.post('/api/auth/logout/', {'refresh_token': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Revocation is stored in the database, not in this process's cache
+        cache.clear()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+class RevocableJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.auth = RevocableJWTAuthentication()
+
+    def test_user_is_loaded_without_unused_columns(self):
+        user = self.auth.get_user(AccessToken.for_user(self.alice))
+        self.assertEqual(user, self.alice)
+        self.assertTrue({'password', 'last_login', 'date_joined'} <= user.get_deferred_fields())
+
+    def test_simplejwt_checks_still_apply(self):
+        token = AccessToken.for_user(self.alice)
+        User.objects.filter(pk=self.alice.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+
+class MessageRowRenderingTests(TestCase):
+    def setUp(self):
+        # MessageViewSet.list is cached per URL
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        conversation = Conversation.objects.create(participants=self.alice)
+        Message.objects.create(sender=self.alice, conversation=conversation, message_body='plain')
+        Message.objects.create(
+            sender=self.alice, conversation=conversation, message_body='edited',
+            edited_at=timezone.now(), is_from_system=True,
+        )
+
+    def test_rows_render_like_the_read_serializer(self):
+        rows = {row['message_id']: row for row in Message.objects.values(*MESSAGE_ROW_FIELDS)}
+        self.assertEqual(len(rows), 2)
+        for message in Message.objects.all():
+            self.assertEqual(message_row_to_dict(rows[message.pk]), MessageReadSerializer(message).data)
+
+    def test_list_endpoint_matches_the_read_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        results = client.get('/api/messages/').json()['results']
+        expected = MessageReadSerializer(Message.objects.order_by('-sent_at'), many=True).data
+        self.assertEqual(results, json.loads(JSONRenderer().render(expected)))
+
+
+class MessageCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        conversation = Conversation.objects.create(participants=self.alice)
+        for i in range(5):
+            Message.objects.create(sender=self.alice, conversation=conversation, message_body=f'm{i}')
+        # Four messages share one sent_at, so only message_id orders them
+        tied = timezone.now()
+        Message.objects.exclude(message_body='m4').update(sent_at=tied)
+        Message.objects.filter(message_body='m4').update(sent_at=tied + timedelta(seconds=1))
+        self.expected = [
+            str(pk) for pk in Message.objects.order_by('-sent_at', '-message_id').values_list('pk', flat=True)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_two_cursor_pages_cover_tied_messages_once(self):
+        first = self.client.get('/api/messages/my_messages/?page_size=3').json()
+        self.assertEqual([row['message_id'] for row in first['results']], self.expected[:3])
+        self.assertIsNotNone(first['next'])
+        self.assertNotIn('count', first)
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['message_id'] for row in second['results']], self.expected[3:])
+        self.assertIsNone(second['next'])
+
+    def test_page_number_is_ignored(self):
+        response = self.client.get('/api/messages/my_messages/?page_size=3&page=2').json()
+        self.assertEqual([row['message_id'] for row in response['results']], self.expected[:3])
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        alice = User.objects.create(username='alice', email='alice@example.com')
+        conversation = Conversation.objects.create(participants=alice)
+        for i in range(5):
+            Message.objects.create(sender=alice, conversation=conversation, message_body=f'm{i}')
+
+    def paginator(self, estimate):
+        # Stands in for a pg_class.reltuples estimate, which only PostgreSQL has
+        paginator = EstimatedCountPaginator(Message.objects.order_by('sent_at'), 2)
+        paginator.__dict__['count'] = estimate
+        paginator.estimated = True
+        return paginator
+
+    def test_overestimate_is_corrected_by_short_page(self):
+        paginator = self.paginator(100)
+        page = paginator.page(3)
+        self.assertEqual(len(page.object_list), 1)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(page.has_next())
+
+    def test_page_past_real_data_is_empty(self):
+        paginator = self.paginator(100)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_underestimate_still_serves_real_pages(self):
+        paginator = self.paginator(2)
+        self.assertEqual(len(paginator.page(3).object_list), 1)
+        self.assertEqual(paginator.count, 5)
+
+
+class ParticipantCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        self.conversation = Conversation.objects.create(participants=self.alice)
+        self.message = Message.objects.create(sender=self.alice, conversation=self.conversation, message_body='hi')
+
+    def check(self, user):
+        # A fresh instance without its conversation loaded goes through the cache
+        return is_participant(user, Message.objects.get(pk=self.message.pk))
+
+    def test_removed_participant_loses_access_before_the_timeout(self):
+        self.assertTrue(self.check(self.alice))
+        self.assertIsNotNone(cache.get(participant_cache_key(self.conversation.pk)))
+
+        self.conversation.participants = self.bob
+        self.conversation.save()
+        self.assertFalse(self.check(self.alice))
+        self.assertTrue(self.check(self.bob))
 
-# Create your tests here.
+    def test_deleted_conversation_drops_its_entry(self):
+        self.assertTrue(self.check(self.alice))
+        key = participant_cache_key(self.conversation.pk)
+        self.conversation.delete()
+        self.assertIsNone(cache.get(key))
@@ -1,19 +1,24 @@
-from rest_framework import viewsets, permissions, status, filters
+from datetime import timedelta
+
+from rest_framework import viewsets, status, filters, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action 
-from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, DateTimeField, ExpressionWrapper, Prefetch
+from django.db.models.functions import Now
 
-from .models import Conversation, Message
-from .serializers import ConversationSerializer, MessageSerializer
+from .models import CONVERSATION_ORDERING, Conversation, Message
+from .serializers import (
+    ConversationSerializer, ConversationReadSerializer, MessageSerializer, MessageReadSerializer,
+    MESSAGE_ROW_FIELDS, message_row_to_dict,
+)
 from .permissions import (
     IsParticipantOfConversation, 
-    IsAuthenticatedAndParticipant, 
     CanManageOwnMessages,
     CanCreateConversation
 )
 from .filters import MessageFilter, ConversationFilter
-from .pagination import MessagePagination, ConversationPagination, CustomMessagePagination
+from .pagination import MessagePagination, ConversationPagination, MessageCursorPagination
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 class ConversationViewSet(viewsets.ModelViewSet):
@@ -23,96 +28,77 @@ class ConversationViewSet(viewsets.ModelViewSet):
 	create: create a conversation for a user (prevents duplicates)
 	retrieve/update/destroy: operate on a single conversation
 	"""
-	queryset = Conversation.objects.all().select_related('participants')
+	# Messages and their senders are fetched in one extra query for the whole page
+	# (newest first, which last_message_preview relies on); msg_count comes from
+	# the same SELECT as the conversations; the ordering is explicit because
+	# Meta.ordering is not applied to GROUP BY queries
+	queryset = Conversation.objects.select_related('participants').annotate(
+		msg_count=Count('messages')
+	).prefetch_related(
+		Prefetch('messages', queryset=Message.objects.select_related('sender').only(
+			'message_id', 'sender', 'conversation', 'message_body', 'sent_at',
+			'edited_at', 'is_deleted', 'is_from_system',
+			# the sender fields sender_summary renders
+			'sender__user_id', 'sender__username', 'sender__email',
+		).order_by('-sent_at'))
+	).order_by(*CONVERSATION_ORDERING)
 	serializer_class = ConversationSerializer
 	permission_classes = [IsParticipantOfConversation, CanCreateConversation]
 	filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
 	filterset_class = ConversationFilter
 	search_fields = ['participants__username', 'participants__email']
-	ordering_fields = ['created_at', 'updated_at']
-	ordering = ['-updated_at']
+	ordering_fields = ['created_at', 'updated_at', 'last_message_at']
+	ordering = CONVERSATION_ORDERING
 	pagination_class = ConversationPagination
 
 	def get_queryset(self):
 		user = self.request.user
-		# Regular users only see their own conversation; staff can see all
-		if user.is_staff or user.is_superuser:
-			return self.queryset.prefetch_related('messages')
-		return self.queryset.filter(participants=user).prefetch_related('messages')
+		# Deleting only needs the row itself, not the messages and count rendered
+		# by the serializer
+		queryset = self.queryset
+		if self.action == 'destroy':
+			queryset = Conversation.objects.only('conversation_id', 'participants')
+		# Regular users only see their own conversation; staff can see all (as a
+		# clone, so no request shares the class-level queryset's result cache).
+		# Detail routes fetch through this too, so another user's conversation
+		# is a single 404 query rather than a fetch followed by a check.
+		return queryset.for_participant(user)
+
+	def get_serializer_class(self):
+		# Reads only render, so they skip the write-only fields and their validators
+		if self.request.method in permissions.SAFE_METHODS:
+			return ConversationReadSerializer
+		return ConversationSerializer
+
+	def filter_queryset(self, queryset):
+		# No query params means nothing for the filter/search/ordering backends to do;
+		# default ordering is already on the viewset queryset
+		if not self.request.query_params:
+			return queryset
+		return super().filter_queryset(queryset)
 
 	def create(self, request, *args, **kwargs):
 		"""
 		Create a conversation with proper access control
 		"""
-		# Allow creating a conversation for the authenticated user by default
-		data = request.data.copy()
+		# Without participants_id the serializer creates the conversation for the
+		# already-loaded request.user, so no id is injected to be looked up again
+		data = request.data
 		user = request.user
 		
-		if 'participants_id' not in data and not user.is_anonymous:
-			data['participants_id'] = user.pk
-		else:
-			# Check if user is trying to create a conversation for someone else
-			participants_id = data.get('participants_id')
-			if participants_id and str(participants_id) != str(user.user_id) and not (user.is_staff or user.is_superuser):
-				return Response(
-					{'error': 'You can only create conversations for yourself.'}, 
-					status=status.HTTP_403_FORBIDDEN
-				)
+		# Check if user is trying to create a conversation for someone else
+		participants_id = data.get('participants_id')
+		if participants_id and str(participants_id) != str(user.user_id) and not (user.is_staff or user.is_superuser):
+			return Response(
+				{'error': 'You can only create conversations for yourself.'}, 
+				status=status.HTTP_403_FORBIDDEN
+			)
 
 		serializer = self.get_serializer(data=data)
 		serializer.is_valid(raise_exception=True)
 		self.perform_create(serializer)
 		headers = self.get_success_headers(serializer.data)
 		return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-	
-	def retrieve(self, request, *args, **kwargs):
-		"""
-		Retrieve a conversation with access control
-		"""
-		instance = self.get_object()
-		user = request.user
-		
-		# Check if user has permission to view this conversation
-		if not (user.is_staff or user.is_superuser or instance.participants == user):
-			return Response(
-				{'error': 'You do not have permission to view this conversation.'}, 
-				status=status.HTTP_403_FORBIDDEN
-			)
-		
-		serializer = self.get_serializer(instance)
-		return Response(serializer.data)
-	
-	def update(self, request, *args, **kwargs):
-		"""
-		Update a conversation with access control
-		"""
-		instance = self.get_object()
-		user = request.user
-		
-		# Check if user has permission to update this conversation
-		if not (user.is_staff or user.is_superuser or instance.participants == user):
-			return Response(
-				{'error': 'You can only update your own conversation.'}, 
-				status=status.HTTP_403_FORBIDDEN
-			)
-		
-		return super().update(request, *args, **kwargs)
-	
-	def destroy(self, request, *args, **kwargs):
-		"""
-		Delete a conversation with access control
-		"""
-		instance = self.get_object()
-		user = request.user
-		
-		# Check if user has permission to delete this conversation
-		if not (user.is_staff or user.is_superuser or instance.participants == user):
-			return Response(
-				{'error': 'You can only delete your own conversation.'}, 
-				status=status.HTTP_403_FORBIDDEN
-			)
-		
-		return super().destroy(request, *args, **kwargs)
 
 
 class MessageViewSet(viewsets.ModelViewSet):
@@ -121,9 +107,12 @@ class MessageViewSet(viewsets.ModelViewSet):
 	list: list messages (scoped to conversation or user's conversation)
 	create: send a message to an existing conversation
 	"""
-	queryset = Message.objects.all().select_related('sender', 'conversation')
+	# get_queryset builds the real queryset per user; this only names the model
+	queryset = Message.objects.none()
 	serializer_class = MessageSerializer
-	permission_classes = [IsParticipantOfConversation, CanManageOwnMessages]
+	# CanManageOwnMessages already requires authentication and participation
+	# (staff aside), so it covers everything IsParticipantOfConversation checks
+	permission_classes = [CanManageOwnMessages]
 	filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
 	filterset_class = MessageFilter
 	search_fields = ['message_body', 'sender__username', 'sender__email']
@@ -136,17 +125,16 @@ class MessageViewSet(viewsets.ModelViewSet):
 		"""Cached list of messages for 60 seconds.
 
 		Relies on get_queryset which already scopes messages by permissions.
-		Uses standard DRF pagination if enabled.
+		Uses standard DRF pagination if enabled. Rows are rendered straight from
+		values() in MessageSerializer's shape, as in my_messages.
 		"""
-		queryset = self.filter_queryset(self.get_queryset())
+		queryset = self.filter_queryset(self.get_queryset()).values(*MESSAGE_ROW_FIELDS)
 
 		page = self.paginate_queryset(queryset)
 		if page is not None:
-			serializer = self.get_serializer(page, many=True)
-			return self.get_paginated_response(serializer.data)
+			return self.get_paginated_response([message_row_to_dict(row) for row in page])
 
-		serializer = self.get_serializer(queryset, many=True)
-		return Response(serializer.data)
+		return Response([message_row_to_dict(row) for row in queryset])
 
 	def get_queryset(self):
 		"""
@@ -159,88 +147,81 @@ class MessageViewSet(viewsets.ModelViewSet):
 		if not user.is_authenticated:
 			return Message.objects.none()
 		
-		# Staff and superusers can see all messages
-		if user.is_staff or user.is_superuser:
-			qs = self.queryset
-		else:
-			# Regular users can only see messages from conversations they participate in
-			qs = Message.objects.filter(conversation__participants=user).select_related('sender', 'conversation')
+		# Staff and superusers can see all messages; regular users only those from
+		# conversations they participate in
+		qs = Message.objects.for_participant(user)
 		
-		# Apply conversation filtering if specified
-		conversation_id = self.request.query_params.get('conversation')
-		if conversation_id:
-			# Verify user has access to this conversation
-			try:
-				conversation = Conversation.objects.get(conversation_id=conversation_id)
-				if not (user.is_staff or user.is_superuser or conversation.participants == user):
-					# User doesn't have permission to access this conversation
-					return Message.objects.none()
-				qs = qs.filter(conversation__conversation_id=conversation_id)
-			except Conversation.DoesNotExist:
-				return Message.objects.none()
+		# ?conversation= is applied by MessageFilter; the participant filter above
+		# already limits it to conversations the user can see
+		
+		if not self.detail:
+			qs = self._hide_deleted(qs)
 		
 		return qs.order_by('-sent_at')
 
+	def _hide_deleted(self, queryset):
+		"""
+		Every listing hides soft-deleted messages unless the client asks for them
+		with ?include_deleted=true or filters on ?is_deleted=; this also keeps
+		msg_active_idx usable. Detail routes return a message either way.
+		"""
+		params = self.request.query_params
+		if 'is_deleted' in params or params.get('include_deleted', '').lower() in ('true', '1'):
+			return queryset
+		return queryset.filter(is_deleted=False)
+
+	def get_serializer_class(self):
+		# See ConversationViewSet.get_serializer_class
+		if self.request.method in permissions.SAFE_METHODS:
+			return MessageReadSerializer
+		return MessageSerializer
+
+	def _get_user_conversation(self, user):
+		"""
+		The user's own conversation (id only), looked up at most once per request;
+		DRF builds a new view instance for every request.
+		"""
+		if not hasattr(self, '_user_conversation'):
+			self._user_conversation = Conversation.objects.filter(participants=user).only('conversation_id').first()
+		return self._user_conversation
+
+	def filter_queryset(self, queryset):
+		# get_queryset already orders by -sent_at, so a bare list needs no backend pass
+		if not self.request.query_params:
+			return queryset
+		return super().filter_queryset(queryset)
+
 	def create(self, request, *args, **kwargs):
 		"""
 		Create a new message with proper access control
 		"""
-		data = request.data.copy()
 		user = request.user
 		
-		# If sender_id is not provided, use request.user
-		if 'sender_id' not in data:
-			data['sender_id'] = user.pk
-
-		# Validate conversation access
-		conversation_id = data.get('conversation')
-		if conversation_id:
-			try:
-				conversation = Conversation.objects.get(conversation_id=conversation_id)
-				# Check if user is participant of this conversation
-				if not (user.is_staff or user.is_superuser or conversation.participants == user):
-					return Response(
-						{'error': 'You do not have permission to send messages to this conversation.'}, 
-						status=status.HTTP_403_FORBIDDEN
-					)
-			except Conversation.DoesNotExist:
-				return Response(
-					{'conversation': 'Conversation not found.'}, 
-					status=status.HTTP_400_BAD_REQUEST
-				)
-		else:
+		# Validate the payload first, so a malformed one is rejected before any
+		# conversation lookup; a conversation given in it is loaded by the
+		# validation itself. Without sender_id the serializer uses request.user
+		serializer = self.get_serializer(data=request.data)
+		serializer.is_valid(raise_exception=True)
+		
+		conversation = serializer.validated_data.get('conversation')
+		if conversation is None:
 			# Try to find the user's conversation
-			try:
-				conversation = Conversation.objects.get(participants=user)
-				data['conversation'] = conversation.conversation_id
-			except Conversation.DoesNotExist:
+			conversation = self._get_user_conversation(user)
+			if conversation is None:
 				return Response(
 					{'conversation': 'Conversation not found for user.'}, 
 					status=status.HTTP_400_BAD_REQUEST
 				)
-
-		serializer = self.get_serializer(data=data, context={'request': request})
-		serializer.is_valid(raise_exception=True)
-		self.perform_create(serializer)
-		headers = self.get_success_headers(serializer.data)
-		return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-	
-	def retrieve(self, request, *args, **kwargs):
-		"""
-		Retrieve a message with access control
-		"""
-		instance = self.get_object()
-		user = request.user
-		
-		# Check if user has permission to view this message
-		if not (user.is_staff or user.is_superuser or instance.conversation.participants == user):
+		# Check if user is participant of this conversation
+		elif not (user.is_staff or user.is_superuser or conversation.participants_id == user.pk):
 			return Response(
-				{'error': 'You do not have permission to view this message.'}, 
+				{'error': 'You do not have permission to send messages to this conversation.'}, 
 				status=status.HTTP_403_FORBIDDEN
 			)
 		
-		serializer = self.get_serializer(instance)
-		return Response(serializer.data)
+		serializer.save(conversation=conversation)
+		headers = self.get_success_headers(serializer.data)
+		return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 	
 	def update(self, request, *args, **kwargs):
 		"""
@@ -250,7 +231,7 @@ class MessageViewSet(viewsets.ModelViewSet):
 		user = request.user
 		
 		# Check if user has permission to update this message
-		if not (user.is_staff or user.is_superuser or instance.sender == user):
+		if not (user.is_staff or user.is_superuser or instance.sender_id == user.pk):
 			return Response(
 				{'error': 'You can only edit your own messages.'}, 
 				status=status.HTTP_403_FORBIDDEN
@@ -266,7 +247,7 @@ class MessageViewSet(viewsets.ModelViewSet):
 		user = request.user
 		
 		# Check if user has permission to delete this message
-		if not (user.is_staff or user.is_superuser or instance.sender == user):
+		if not (user.is_staff or user.is_superuser or instance.sender_id == user.pk):
 			return Response(
 				{'error': 'You can only delete your own messages.'}, 
 				status=status.HTTP_403_FORBIDDEN
@@ -274,10 +255,14 @@ class MessageViewSet(viewsets.ModelViewSet):
 		
 		return super().destroy(request, *args, **kwargs)
 	
-	@action(detail=False, methods=['get'])
+	@action(
+		detail=False, methods=['get'],
+		pagination_class=MessageCursorPagination, filter_backends=[DjangoFilterBackend]
+	)
 	def my_messages(self, request):
 		"""
-		Get all messages from the current user's conversation with pagination and filtering
+		Get all messages from the current user's conversation with pagination and filtering.
+		Pages follow ?cursor= links (keyset on sent_at), so no COUNT(*) or OFFSET scan.
 		"""
 		user = request.user
 		
@@ -288,31 +273,63 @@ class MessageViewSet(viewsets.ModelViewSet):
 			)
 		
 		# Get messages using explicit filtering
-		messages = Message.objects.filter(
+		messages = self._hide_deleted(Message.objects.with_related().filter(
 			conversation__participants=user
-		).select_related('sender', 'conversation').order_by('-sent_at')
+		)).order_by('-sent_at')
 		
 		# Apply additional filters if provided
 		filterset = MessageFilter(request.GET, queryset=messages)
 		if filterset.is_valid():
 			messages = filterset.qs
 		
+		# Read-only listing: plain rows in MessageSerializer's shape, with no model
+		# instances built per message
+		messages = messages.values(*MESSAGE_ROW_FIELDS)
+		
 		page = self.paginate_queryset(messages)
 		if page is not None:
-			serializer = self.get_serializer(page, many=True)
-			return self.get_paginated_response(serializer.data)
+			return self.get_paginated_response([message_row_to_dict(row) for row in page])
 		
-		serializer = self.get_serializer(messages, many=True)
-		return Response(serializer.data)
+		return Response([message_row_to_dict(row) for row in messages])
 	
 	@action(detail=False, methods=['get'])
+	def summary(self, request):
+		"""
+		Lightweight message listing: flat rows straight from the database,
+		without building model instances or running MessageSerializer
+		"""
+		queryset = self.filter_queryset(self.get_queryset()).values(
+			'message_id', 'message_body', 'sender__username', 'sent_at'
+		)
+		
+		page = self.paginate_queryset(queryset)
+		if page is not None:
+			return self.get_paginated_response(page)
+		
+		return Response(list(queryset))
+	
+	@action(
+		detail=False, methods=['get'],
+		pagination_class=MessageCursorPagination, filter_backends=[DjangoFilterBackend]
+	)
+	def feed(self, request):
+		"""
+		Infinite-scroll message list, newest first. Pages follow ?cursor=
+		links, so fetching a deep page costs the same as the first one.
+		"""
+		queryset = self.filter_queryset(self.get_queryset())
+		page = self.paginate_queryset(queryset)
+		serializer = self.get_serializer(page, many=True)
+		return self.get_paginated_response(serializer.data)
+	
+	@action(
+		detail=False, methods=['get'],
+		pagination_class=MessageCursorPagination, filter_backends=[DjangoFilterBackend]
+	)
 	def recent_messages(self, request):
 		"""
 		Get recent messages from the current user's conversation (last 24 hours)
 		"""
-		from datetime import timedelta
-		from django.utils import timezone
-		
 		user = request.user
 		
 		if not user.is_authenticated:
@@ -321,22 +338,24 @@ class MessageViewSet(viewsets.ModelViewSet):
 				status=status.HTTP_401_UNAUTHORIZED
 			)
 		
-		# Get messages from last 24 hours
-		last_24_hours = timezone.now() - timedelta(hours=24)
-		messages = Message.objects.filter(
+		# Get messages from last 24 hours; the cutoff is computed by the database
+		# so the statement text and its parameters are the same on every call
+		last_24_hours = ExpressionWrapper(Now() - timedelta(hours=24), output_field=DateTimeField())
+		messages = self._hide_deleted(Message.objects.filter(
 			conversation__participants=user,
 			sent_at__gte=last_24_hours
-		).select_related('sender', 'conversation').order_by('-sent_at')
+		)).order_by('-sent_at').values(*MESSAGE_ROW_FIELDS)
 		
 		page = self.paginate_queryset(messages)
 		if page is not None:
-			serializer = self.get_serializer(page, many=True)
-			return self.get_paginated_response(serializer.data)
+			return self.get_paginated_response([message_row_to_dict(row) for row in page])
 		
-		serializer = self.get_serializer(messages, many=True)
-		return Response(serializer.data)
+		return Response([message_row_to_dict(row) for row in messages])
 	
-	@action(detail=False, methods=['get'])
+	@action(
+		detail=False, methods=['get'],
+		pagination_class=MessageCursorPagination, filter_backends=[DjangoFilterBackend]
+	)
 	def search_messages(self, request):
 		"""
 		Search messages with advanced filtering and pagination
@@ -350,14 +369,14 @@ class MessageViewSet(viewsets.ModelViewSet):
 			)
 		
 		# Base queryset
-		queryset = Message.objects.filter(
+		queryset = self._hide_deleted(Message.objects.filter(
 			conversation__participants=user
-		).select_related('sender', 'conversation')
+		))
 		
-		# Apply filters
+		# Apply filters, then read plain rows in MessageSerializer's shape
 		filterset = MessageFilter(request.GET, queryset=queryset)
 		if filterset.is_valid():
-			filtered_messages = filterset.qs.order_by('-sent_at')
+			filtered_messages = filterset.qs.order_by('-sent_at').values(*MESSAGE_ROW_FIELDS)
 		else:
 			return Response(
 				{'error': 'Invalid filter parameters', 'details': filterset.errors}, 
@@ -367,22 +386,20 @@ class MessageViewSet(viewsets.ModelViewSet):
 		# Apply pagination
 		page = self.paginate_queryset(filtered_messages)
 		if page is not None:
-			serializer = self.get_serializer(page, many=True)
-			response_data = self.get_paginated_response(serializer.data)
+			response_data = self.get_paginated_response([message_row_to_dict(row) for row in page])
 			
 			# Add filter information to response
 			response_data.data['applied_filters'] = {
 				key: value for key, value in request.GET.items()
-				if value and key not in ['page', 'page_size']
+				if value and key not in ['cursor', 'page_size']
 			}
 			return response_data
 		
-		serializer = self.get_serializer(filtered_messages, many=True)
 		return Response({
-			'results': serializer.data,
+			'results': [message_row_to_dict(row) for row in filtered_messages],
 			'applied_filters': {
 				key: value for key, value in request.GET.items()
-				if value and key not in ['page', 'page_size']
+				if value and key not in ['cursor', 'page_size']
 			}
 		})
 
@@ -5,6 +5,44 @@ for automatically handling database connections.
 """
 import sqlite3
 
+# File databases whose schema this process has already bootstrapped
+_SCHEMA_INITIALIZED = set()
+
+
+def _init_schema(connection):
+    """
+    Create the users table and seed it with sample data if it is empty.
+
+    Args:
+        connection: Open connection to the database to prepare
+    """
+    # The table and its seed rows commit together, so a new file database
+    # syncs its journal once instead of twice
+    with connection:
+        connection.execute('BEGIN')
+        
+        # Create a users table if it doesn't exist
+        cursor = connection.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL
+            )
+        ''')
+        
+        # Insert some sample data if the table is empty
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO users (name, email) VALUES (?, ?)",
+                [
+                    ("Alice", "alice@example.com"),
+                    ("Bob", "bob@example.com"),
+                    ("Charlie", "charlie@example.com")
+                ]
+            )
+
 
 class DatabaseConnection:
     """
@@ -35,28 +73,12 @@ class DatabaseConnection:
         # Configure the connection to return rows as dictionaries
         self.connection.row_factory = sqlite3.Row
         
-        # Create a users table if it doesn't exist (for demonstration)
-        cursor = self.connection.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL
-            )
-        ''')
-        
-        # Insert some sample data if the table is empty
-        cursor.execute("SELECT COUNT(*) FROM users")
-        if cursor.fetchone()[0] == 0:
-            cursor.executemany(
-                "INSERT INTO users (name, email) VALUES (?, ?)",
-                [
-                    ("Alice", "alice@example.com"),
-                    ("Bob", "bob@example.com"),
-                    ("Charlie", "charlie@example.com")
-                ]
-            )
-            self.connection.commit()
+        # Create and seed the users table (for demonstration). A file database
+        # only needs this once per process; ':memory:' is new on every connect
+        if self.db_path == ':memory:' or self.db_path not in _SCHEMA_INITIALIZED:
+            _init_schema(self.connection)
+            if self.db_path != ':memory:':
+                _SCHEMA_INITIALIZED.add(self.db_path)
             
         return self
 
@@ -76,6 +98,27 @@ class DatabaseConnection:
         # Return False to propagate exceptions if they occurred
         return False
 
+    @staticmethod
+    def iter_results(cursor, arraysize=1000):
+        """
+        Yield the rows of an executed query as dictionaries.
+
+        Rows are fetched ``arraysize`` at a time, so a large result set is
+        never held in memory all at once.
+
+        Args:
+            cursor: A cursor that has executed a query
+            arraysize (int): Number of rows fetched per round trip
+
+        Yields:
+            dict: One row of the results
+        """
+        while True:
+            rows = cursor.fetchmany(arraysize)
+            if not rows:
+                break
+            yield from (dict(row) for row in rows)
+
     def execute_query(self, query, params=None):
         """
         Execute a SQL query on the database.
@@ -85,7 +128,9 @@ class DatabaseConnection:
             params (tuple): Optional parameters for the query
 
         Returns:
-            list: The results of the query
+            iterator: The rows of a SELECT, yielded as dictionaries while the
+                connection is open (wrap in list() to keep them); an empty
+                list for other statements
         """
         if not self.connection:
             raise RuntimeError("Database connection not established")
@@ -98,9 +143,11 @@ class DatabaseConnection:
         else:
             cursor.execute(query)
             
-        # If this is a SELECT query, return the results
-        if query.strip().upper().startswith("SELECT"):
-            return [dict(row) for row in cursor.fetchall()]
+        # sqlite3 sets description for statements that return rows (SELECT,
+        # WITH, PRAGMA...) without re-parsing the query text; a pending
+        # transaction means a data change that still needs its commit
+        if cursor.description is not None and not self.connection.in_transaction:
+            return self.iter_results(cursor)
         
         # Otherwise, commit the changes and return empty list
         self.connection.commit()
@@ -5,6 +5,46 @@ for executing database queries with automatic connection handling.
 """
 import sqlite3
 
+# File databases whose schema this process has already bootstrapped
+_SCHEMA_INITIALIZED = set()
+
+
+def _init_schema(connection):
+    """
+    Create the users table and seed it with sample data if it is empty.
+
+    Args:
+        connection: Open connection to the database to prepare
+    """
+    # The table and its seed rows commit together, so a new file database
+    # syncs its journal once instead of twice
+    with connection:
+        connection.execute('BEGIN')
+        
+        # Create a users table if it doesn't exist
+        cursor = connection.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                age INTEGER
+            )
+        ''')
+        
+        # Insert some sample data if the table is empty
+        cursor.execute("SELECT COUNT(*) FROM users")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                [
+                    ("Alice", "alice@example.com", 30),
+                    ("Bob", "bob@example.com", 22),
+                    ("Charlie", "charlie@example.com", 45),
+                    ("David", "david@example.com", 18)
+                ]
+            )
+
 
 class ExecuteQuery:
     """
@@ -35,37 +75,20 @@ class ExecuteQuery:
         and execute the query.
         
         Returns:
-            list: The results of the query
+            iterator: The rows of a SELECT, yielded as dictionaries while the
+                connection is open; an empty list for other statements
         """
         print(f"Connecting to SQLite database at {self.db_path}...")
         self.connection = sqlite3.connect(self.db_path)
         # Configure the connection to return rows as dictionaries
         self.connection.row_factory = sqlite3.Row
         
-        # Create a users table if it doesn't exist (for demonstration)
-        cursor = self.connection.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                age INTEGER
-            )
-        ''')
-        
-        # Insert some sample data if the table is empty
-        cursor.execute("SELECT COUNT(*) FROM users")
-        if cursor.fetchone()[0] == 0:
-            cursor.executemany(
-                "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
-                [
-                    ("Alice", "alice@example.com", 30),
-                    ("Bob", "bob@example.com", 22),
-                    ("Charlie", "charlie@example.com", 45),
-                    ("David", "david@example.com", 18)
-                ]
-            )
-            self.connection.commit()
+        # Create and seed the users table (for demonstration). A file database
+        # only needs this once per process; ':memory:' is new on every connect
+        if self.db_path == ':memory:' or self.db_path not in _SCHEMA_INITIALIZED:
+            _init_schema(self.connection)
+            if self.db_path != ':memory:':
+                _SCHEMA_INITIALIZED.add(self.db_path)
         
         # Execute the query if provided
         if self.query:
@@ -75,9 +98,11 @@ class ExecuteQuery:
             else:
                 cursor.execute(self.query)
             
-            # If this is a SELECT query, store the results
-            if self.query.strip().upper().startswith("SELECT"):
-                self.results = [dict(row) for row in cursor.fetchall()]
+            # sqlite3 sets description for statements that return rows (SELECT,
+            # WITH, PRAGMA...) without re-parsing the query text; a pending
+            # transaction means a data change that still needs its commit
+            if cursor.description is not None and not self.connection.in_transaction:
+                self.results = self.iter_results(cursor)
             else:
                 # Otherwise, commit the changes
                 self.connection.commit()
@@ -85,6 +110,27 @@ class ExecuteQuery:
         
         return self.results
 
+    @staticmethod
+    def iter_results(cursor, arraysize=1000):
+        """
+        Yield the rows of an executed query as dictionaries.
+
+        Rows are fetched ``arraysize`` at a time, so a large result set is
+        never held in memory all at once.
+
+        Args:
+            cursor: A cursor that has executed a query
+            arraysize (int): Number of rows fetched per round trip
+
+        Yields:
+            dict: One row of the results
+        """
+        while True:
+            rows = cursor.fetchmany(arraysize)
+            if not rows:
+                break
+            yield from (dict(row) for row in rows)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
         Exit the context manager: close the database connection.
@@ -110,10 +156,11 @@ if __name__ == "__main__":
     ) as results:
         # Print the results
         print("\nQuery Results:")
-        if results:
-            for row in results:
-                print(row)
-        else:
+        found = False
+        for row in results:
+            found = True
+            print(row)
+        if not found:
             print("No results found.")
     
     # The connection is automatically closed when exiting the with block
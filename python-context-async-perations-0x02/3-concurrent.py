@@ -6,45 +6,43 @@ This module executes multiple database queries concurrently using asyncio.gather
 import asyncio
 import aiosqlite
 
+# A plain ':memory:' path gives every connection its own empty database; a
+# named shared-cache URI lets all connections see the same one for as long as
+# at least one of them stays open
+DB_PATH = 'file:concurrent_users?mode=memory&cache=shared'
 
-async def setup_database():
+
+async def setup_database(db):
     """
     Setup the database with sample data for demonstration.
     
-    Returns:
-        str: Path to the in-memory database
+    Args:
+        db: Open connection to the shared database; it must stay open while
+            the queries run, or the in-memory database is dropped
     """
-    db_path = ':memory:'
-    
-    async with aiosqlite.connect(db_path) as db:
-        # Enable returning rows as dictionaries
-        db.row_factory = aiosqlite.Row
-        
-        # Create users table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                age INTEGER
-            )
-        ''')
-        
-        # Insert sample data
-        await db.executemany(
-            "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
-            [
-                ("Alice", "alice@example.com", 30),
-                ("Bob", "bob@example.com", 22),
-                ("Charlie", "charlie@example.com", 45),
-                ("David", "david@example.com", 50),
-                ("Eve", "eve@example.com", 38)
-            ]
+    # Create users table
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            age INTEGER
         )
-        
-        await db.commit()
+    ''')
+    
+    # Insert sample data in one batch, committed once
+    await db.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        [
+            ("Alice", "alice@example.com", 30),
+            ("Bob", "bob@example.com", 22),
+            ("Charlie", "charlie@example.com", 45),
+            ("David", "david@example.com", 50),
+            ("Eve", "eve@example.com", 38)
+        ]
+    )
     
-    return db_path
+    await db.commit()
 
 
 async def async_fetch_users(db_path):
@@ -58,7 +56,7 @@ async def async_fetch_users(db_path):
         list: All users in the database
     """
     print("Starting to fetch all users...")
-    async with aiosqlite.connect(db_path) as db:
+    async with aiosqlite.connect(db_path, uri=True) as db:
         db.row_factory = aiosqlite.Row
         
         async with db.execute("SELECT * FROM users") as cursor:
@@ -80,7 +78,7 @@ async def async_fetch_older_users(db_path):
         list: Users older than 40
     """
     print("Starting to fetch users older than 40...")
-    async with aiosqlite.connect(db_path) as db:
+    async with aiosqlite.connect(db_path, uri=True) as db:
         db.row_factory = aiosqlite.Row
         
         async with db.execute("SELECT * FROM users WHERE age > 40") as cursor:
@@ -98,15 +96,16 @@ async def fetch_concurrently():
     Returns:
         tuple: A tuple containing the results of both queries
     """
-    # Setup the database
-    db_path = await setup_database()
-    
-    # Run both queries concurrently
-    print("Starting concurrent database queries...")
-    all_users, older_users = await asyncio.gather(
-        async_fetch_users(db_path),
-        async_fetch_older_users(db_path)
-    )
+    # Setup the database, keeping this connection open until both queries finish
+    async with aiosqlite.connect(DB_PATH, uri=True) as db:
+        await setup_database(db)
+        
+        # Run both queries concurrently
+        print("Starting concurrent database queries...")
+        all_users, older_users = await asyncio.gather(
+            async_fetch_users(DB_PATH),
+            async_fetch_older_users(DB_PATH)
+        )
     
     print("\nResults from concurrent queries:")
     print(f"All users ({len(all_users)}):")
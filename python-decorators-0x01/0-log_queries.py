@@ -4,7 +4,20 @@ Module for SQL query logging decorator
 """
 import sqlite3
 import functools
-from datetime import datetime
+import logging
+import sys
+
+# Query log; the timestamp is only formatted for records the level lets
+# through, so setLevel(logging.WARNING) reduces logging to a level check
+logger = logging.getLogger('sql')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter(
+        '[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 def log_queries():
@@ -22,8 +35,7 @@ def log_queries():
                 query = args[0]
             
             # Log the query with timestamp
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{current_time}] Query: {query}")
+            logger.info("Query: %s", query)
             
             # Execute the original function
             return func(*args, **kwargs)
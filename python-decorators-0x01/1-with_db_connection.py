@@ -4,11 +4,29 @@ Module for database connection handling decorator
 """
 import sqlite3
 import functools
+import threading
+import weakref
+
+# One connection per thread, reused across calls instead of reopened each time
+_local = threading.local()
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it when the thread ends."""
+
+    def __init__(self):
+        # The thread clearing _local on exit may not be the one that opened it
+        self.conn = sqlite3.connect('users.db', check_same_thread=False)
+        # Runs once the holder is dropped, or at interpreter exit if it never is
+        self.close = weakref.finalize(self, self.conn.close)
 
 
 def with_db_connection(func):
     """
-    Decorator that automatically handles opening and closing database connections
+    Decorator that automatically provides a database connection
+    
+    The connection is opened on a thread's first call, reused by later calls
+    on that thread, and closed when the thread ends.
     
     Args:
         func: The function to be decorated
@@ -18,16 +36,20 @@ def with_db_connection(func):
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+        holder = getattr(_local, 'holder', None)
+        if holder is None:
+            holder = _local.holder = _ThreadConnection()
+        conn = holder.conn
         
         try:
             # Call the original function with connection as first argument
             result = func(conn, *args, **kwargs)
             return result
         finally:
-            # Ensure connection is closed even if an exception occurs
-            conn.close()
+            # Closing used to discard uncommitted work; keep that for the
+            # reused connection even if an exception occurs
+            if conn.in_transaction:
+                conn.rollback()
     
     return wrapper
 
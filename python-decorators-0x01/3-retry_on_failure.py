@@ -2,14 +2,33 @@
 """
 Module for database connection and retry decorators
 """
+import random
 import time
 import sqlite3
 import functools
+import threading
+import weakref
+
+# One connection per thread, reused across calls instead of reopened each time
+_local = threading.local()
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it when the thread ends."""
+
+    def __init__(self):
+        # The thread clearing _local on exit may not be the one that opened it
+        self.conn = sqlite3.connect('users.db', check_same_thread=False)
+        # Runs once the holder is dropped, or at interpreter exit if it never is
+        self.close = weakref.finalize(self, self.conn.close)
 
 
 def with_db_connection(func):
     """
-    Decorator that automatically handles opening and closing database connections
+    Decorator that automatically provides a database connection
+    
+    The connection is opened on a thread's first call, reused by later calls
+    on that thread, and closed when the thread ends.
     
     Args:
         func: The function to be decorated
@@ -19,27 +38,46 @@ def with_db_connection(func):
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+        holder = getattr(_local, 'holder', None)
+        if holder is None:
+            holder = _local.holder = _ThreadConnection()
+        conn = holder.conn
         
         try:
             # Call the original function with connection as first argument
             result = func(conn, *args, **kwargs)
             return result
+        except sqlite3.Error:
+            # Start the next call on a fresh connection rather than a possibly broken one
+            del _local.holder
+            holder.close()
+            raise
         finally:
-            # Ensure connection is closed even if an exception occurs
-            conn.close()
+            # Closing used to discard uncommitted work; keep that for the
+            # reused connection even if an exception occurs
+            if getattr(_local, 'holder', None) is holder and conn.in_transaction:
+                conn.rollback()
     
     return wrapper
 
 
-def retry_on_failure(retries=3, delay=2):
+def retry_on_failure(retries=3, delay=2, max_delay=30, jitter=0.5,
+                     recoverable=(sqlite3.OperationalError,)):
     """
-    Decorator that retries a function if it raises an exception
+    Decorator that retries a function if it raises a recoverable exception
+    
+    The wait doubles after every failed attempt, starting at ``delay`` and
+    capped at ``max_delay``, and is stretched by a random factor of up to
+    ``jitter`` so callers failing together do not retry in lockstep.
     
     Args:
         retries: Number of retry attempts (default: 3)
-        delay: Delay between retries in seconds (default: 2)
+        delay: Delay before the first retry in seconds (default: 2)
+        max_delay: Upper bound on any single delay in seconds (default: 30)
+        jitter: Largest random fraction added to a delay (default: 0.5)
+        recoverable: Exception types worth retrying; anything else, such
+            as a programming error in the SQL, is raised at once
+            (default: sqlite3.OperationalError, e.g. a locked database)
         
     Returns:
         Decorator function
@@ -48,22 +86,22 @@ def retry_on_failure(retries=3, delay=2):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             attempts = 0
-            last_exception = None
             
-            while attempts <= retries:
+            while True:
                 try:
                     return func(*args, **kwargs)
-                except Exception as e:
+                except recoverable as e:
                     attempts += 1
-                    last_exception = e
                     
-                    if attempts <= retries:
-                        print(f"Operation failed: {str(e)}. Retrying in {delay} seconds... "
-                              f"(Attempt {attempts}/{retries})")
-                        time.sleep(delay)
-                    else:
+                    if attempts > retries:
                         print(f"All {retries} retry attempts failed. Giving up.")
-                        raise last_exception
+                        raise
+                    
+                    wait = min(max_delay, delay * 2 ** (attempts - 1))
+                    wait *= 1 + random.random() * jitter
+                    print(f"Operation failed: {str(e)}. Retrying in {wait:.2f} seconds... "
+                          f"(Attempt {attempts}/{retries})")
+                    time.sleep(wait)
             
         return wrapper
     return decorator
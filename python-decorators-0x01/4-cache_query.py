@@ -5,15 +5,51 @@ Module for database connection and caching decorators
 import time
 import sqlite3
 import functools
+import threading
+import weakref
+from collections import OrderedDict
 
 
-# Global cache dictionary to store query results
-query_cache = {}
+# Global cache of query results, least recently used first; keyed on the query
+# and its bind parameters, and capped at QUERY_CACHE_SIZE entries. Each entry
+# holds the _db_version() it was read at and is only reused while that holds,
+# whichever thread asks
+QUERY_CACHE_SIZE = 256
+query_cache = OrderedDict()
+
+# Misses currently being fetched, so concurrent callers of the same query
+# wait for one result instead of all hitting the database; the lock also
+# guards query_cache, _write_count and _version_reader
+_inflight = {}
+_cache_lock = threading.Lock()
+
+# Calls through with_db_connection that changed rows, in any thread
+_write_count = 0
+
+# Connection shared by all threads that only ever reads PRAGMA data_version;
+# opened on the first cache lookup
+_version_reader = None
+
+# One connection per thread, reused across calls instead of reopened each time
+_local = threading.local()
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it when the thread ends."""
+
+    def __init__(self):
+        # The thread clearing _local on exit may not be the one that opened it
+        self.conn = sqlite3.connect('users.db', check_same_thread=False)
+        # Runs once the holder is dropped, or at interpreter exit if it never is
+        self.close = weakref.finalize(self, self.conn.close)
 
 
 def with_db_connection(func):
     """
-    Decorator that automatically handles opening and closing database connections
+    Decorator that automatically provides a database connection
+    
+    The connection is opened on a thread's first call, reused by later calls
+    on that thread, and closed when the thread ends.
     
     Args:
         func: The function to be decorated
@@ -23,24 +59,51 @@ def with_db_connection(func):
     """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
+        holder = getattr(_local, 'holder', None)
+        if holder is None:
+            holder = _local.holder = _ThreadConnection()
+        conn = holder.conn
+        changes = conn.total_changes
         
         try:
             # Call the original function with connection as first argument
             result = func(conn, *args, **kwargs)
             return result
         finally:
-            # Ensure connection is closed even if an exception occurs
-            conn.close()
+            # Closing used to discard uncommitted work; keep that for the
+            # reused connection even if an exception occurs
+            if conn.in_transaction:
+                conn.rollback()
+            if conn.total_changes != changes:
+                _note_write()
     
     return wrapper
 
 
+def _note_write():
+    """Invalidate every cached result after a write through this module."""
+    global _write_count
+    with _cache_lock:
+        _write_count += 1
+
+
+def _db_version():
+    """Token that changes whenever users.db may have changed; hold _cache_lock."""
+    global _version_reader
+    if _version_reader is None:
+        _version_reader = _ThreadConnection()
+    # data_version on the shared reader moves whenever any other connection
+    # commits, including ones in other processes
+    data_version = _version_reader.conn.execute('PRAGMA data_version').fetchone()[0]
+    return _write_count, data_version
+
+
 def cache_query(func):
     """
     Decorator that caches query results to avoid redundant database calls
     
+    A cached result is dropped once the database has been written to.
+    
     Args:
         func: The function to be decorated
         
@@ -51,23 +114,56 @@ def cache_query(func):
     def wrapper(conn, *args, **kwargs):
         # Extract query parameter from args or kwargs
         query = kwargs.get('query')
+        params = args
         if not query and args:
-            query = args[0]
+            query, params = args[0], args[1:]
             
         # If no query is provided, cannot cache
         if not query:
             return func(conn, *args, **kwargs)
+        
+        # The same SQL with different parameters is a different result
+        key = (query, params, tuple(sorted(
+            (name, value) for name, value in kwargs.items() if name != 'query'
+        )))
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable parameters (e.g. a list) cannot be cached
+            return func(conn, *args, **kwargs)
             
-        # Check if query result is already in cache
-        if query in query_cache:
-            print(f"Using cached result for query: {query}")
-            return query_cache[query]
-            
-        # Execute the function to get the result
-        result = func(conn, *args, **kwargs)
+        while True:
+            with _cache_lock:
+                version = _db_version()
+                # Check if query result is already in cache and still current
+                entry = query_cache.get(key)
+                if entry is not None and entry[0] == version:
+                    query_cache.move_to_end(key)
+                    print(f"Using cached result for query: {query}")
+                    return entry[1]
+                done = _inflight.get(key)
+                if done is None:
+                    # Nobody is fetching it: this call does
+                    done = _inflight[key] = threading.Event()
+                    break
+            # Another caller is fetching this query; wait, then look again
+            # (and fetch it here if that call failed)
+            done.wait()
         
-        # Cache the result
-        query_cache[query] = result
+        try:
+            # Execute the function to get the result
+            result = func(conn, *args, **kwargs)
+            
+            # Cache the result, evicting the least recently used one when full
+            with _cache_lock:
+                query_cache[key] = (version, result)
+                query_cache.move_to_end(key)
+                if len(query_cache) > QUERY_CACHE_SIZE:
+                    query_cache.popitem(last=False)
+        finally:
+            with _cache_lock:
+                del _inflight[key]
+            done.set()
         print(f"Cached result for query: {query}")
         
         return result
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test cases for the cache_query decorator.
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+cache_module = __import__('4-cache_query')
+
+
+class TestCacheQuery(unittest.TestCase):
+    """Test class for cache_query and its invalidation."""
+
+    def setUp(self):
+        """Run each test against a fresh users.db and an empty cache."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+        conn = sqlite3.connect('users.db')
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO users (name) VALUES ('alice')")
+        conn.commit()
+        conn.close()
+
+        self._reset_module()
+        self.addCleanup(self._reset_module)
+
+        # The decorator reports hits and misses on stdout
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+        self.calls = []
+
+        self.fetch_delay = 0
+
+        @cache_module.with_db_connection
+        @cache_module.cache_query
+        def count_users(conn, query):
+            self.calls.append(threading.get_ident())
+            time.sleep(self.fetch_delay)
+            return conn.execute(query).fetchall()
+
+        @cache_module.with_db_connection
+        def add_user(conn, name):
+            conn.execute("INSERT INTO users (name) VALUES (?)", (name,))
+            conn.commit()
+
+        self.count_users = count_users
+        self.add_user = add_user
+
+    @staticmethod
+    def _reset_module():
+        """Drop cached results and the connections opened for the last test."""
+        cache_module.query_cache.clear()
+        holder = getattr(cache_module._local, 'holder', None)
+        if holder is not None:
+            del cache_module._local.holder
+            holder.close()
+        if cache_module._version_reader is not None:
+            cache_module._version_reader.close()
+            cache_module._version_reader = None
+
+    def _run_in_thread(self, func, *args):
+        """Call func on a new thread and return its result."""
+        results = []
+        thread = threading.Thread(target=lambda: results.append(func(*args)))
+        thread.start()
+        thread.join()
+        return results[0]
+
+    def test_repeated_query_is_cached(self):
+        """Test that a second call does not reach the database."""
+        query = "SELECT COUNT(*) FROM users"
+        self.assertEqual(self.count_users(query=query), [(1,)])
+        self.assertEqual(self.count_users(query=query), [(1,)])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_cached_result_is_shared_between_threads(self):
+        """Test that a result cached by one thread is a hit in another."""
+        query = "SELECT COUNT(*) FROM users"
+        self.count_users(query=query)
+        self.assertEqual(self._run_in_thread(self.count_users, query), [(1,)])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_concurrent_misses_fetch_once(self):
+        """Test that threads missing on the same query share one fetch."""
+        query = "SELECT COUNT(*) FROM users"
+        # Long enough that every thread arrives while the first is fetching
+        self.fetch_delay = 0.2
+        barrier = threading.Barrier(4)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(self.count_users(query=query))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [[(1,)]] * 4)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_write_through_decorator_invalidates(self):
+        """Test that a write made with with_db_connection drops the result."""
+        query = "SELECT COUNT(*) FROM users"
+        self.count_users(query=query)
+        self._run_in_thread(self.add_user, 'bob')
+        self.assertEqual(self.count_users(query=query), [(2,)])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_write_from_other_connection_invalidates(self):
+        """Test that a commit from an unrelated connection drops the result."""
+        query = "SELECT COUNT(*) FROM users"
+        self.count_users(query=query)
+        conn = sqlite3.connect('users.db')
+        conn.execute("INSERT INTO users (name) VALUES ('carol')")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.count_users(query=query), [(2,)])
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,38 @@
 from seed import connect_to_prodev
 
-def stream_users():
+# Rows pulled from the server per fetchmany() call
+FETCH_SIZE = 1000
+
+
+def stream_user_batches(batch_size=FETCH_SIZE, limit=None):
+    """Yield lists of up to batch_size users, one fetchmany() each.
+
+    With ``limit`` the server stops after that many rows instead of sending
+    the whole table to a consumer that only wants the first few.
+    """
     connection = connect_to_prodev()
     if not connection:
         return
     cursor = connection.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
-        for row in cursor:
-            row['age'] = int(row['age'])
-            yield row
+        # age is DECIMAL(10,0); the server casts it so rows arrive as ints
+        query = "SELECT user_id, name, email, CAST(age AS SIGNED) AS age FROM user_data"
+        if limit is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + " LIMIT %s", (int(limit),))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
     finally:
         cursor.close()
         connection.close()
+
+
+def stream_users(limit=None):
+    # Bulk consumers can take stream_user_batches() directly and skip the
+    # per-row resume of this generator
+    for rows in stream_user_batches(limit=limit):
+        yield from rows
@@ -1,22 +1,33 @@
 import csv
 
-def stream_users_in_batches(batch_size):
-    """Yield batches of users from user_data.csv."""
+def _stream_rows_in_batches(batch_size):
+    """Yield (header, batch) pairs of plain csv rows from user_data.csv."""
     with open('python-generators-0x00/user_data.csv', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            return
         batch = []
         for row in reader:
             batch.append(row)
             if len(batch) == batch_size:
-                yield batch
+                yield header, batch
                 batch = []
         if batch:
-            yield batch
+            yield header, batch
+
+
+def stream_users_in_batches(batch_size):
+    """Yield batches of users from user_data.csv."""
+    for header, rows in _stream_rows_in_batches(batch_size):
+        yield [dict(zip(header, row)) for row in rows]
 
 
 def batch_processing(batch_size):
     """Process each batch and print users over age 25."""
-    for batch in stream_users_in_batches(batch_size):
-        for user in batch:
-            if int(user['age']) > 25:
-                print(user)
+    # Filter on the raw rows; only users that get printed are turned into dicts
+    for header, rows in _stream_rows_in_batches(batch_size):
+        age_index = header.index('age')
+        for row in rows:
+            if int(row[age_index]) > 25:
+                print(dict(zip(header, row)))
@@ -5,29 +5,59 @@ This module implements a lazy pagination generator for users.
 seed = __import__('seed')
 
 
-def paginate_users(page_size, offset):
+def paginate_users(page_size, offset, connection=None):
     """
     Fetch users from the database with pagination.
     
     Args:
         page_size: Number of records to fetch per page
         offset: Starting position for fetching records
+        connection: Open connection to reuse across pages; when omitted a
+            connection is opened and closed for this page only
         
     Returns:
         List of user dictionaries
     """
-    connection = seed.connect_to_prodev()
+    own_connection = connection is None
+    if own_connection:
+        connection = seed.connect_to_prodev()
     cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    connection.close()
-    return rows
+    try:
+        cursor.execute("SELECT * FROM user_data LIMIT %s OFFSET %s", (page_size, offset))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_connection:
+            connection.close()
+
+
+def paginate_users_after(cursor, page_size, last_id):
+    """
+    Fetch the page of users that follows ``last_id``, in user_id order.
+    
+    Unlike an OFFSET, the primary key range lets the server start reading
+    right after the previous page, so a deep page costs the same as the first.
+    
+    Args:
+        cursor: Open dictionary cursor to run the query on
+        page_size: Number of records to fetch per page
+        last_id: user_id of the last record already seen ('' for the start)
+        
+    Returns:
+        List of user dictionaries
+    """
+    cursor.execute(
+        "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+        (last_id, page_size),
+    )
+    return cursor.fetchall()
 
 
 def lazy_pagination(page_size):
     """
     A generator function that lazily paginates through user data.
-    Only fetches the next page when needed, starting from offset 0.
+    Only fetches the next page when needed, continuing after the last
+    user_id seen over a single connection and cursor.
     
     Args:
         page_size: Number of records to fetch per page
@@ -35,15 +65,23 @@ def lazy_pagination(page_size):
     Yields:
         A page of user records as a list of dictionaries
     """
-    offset = 0
-    while True:
-        # Fetch the current page of results
-        page = paginate_users(page_size, offset)
-        
-        # If the page is empty, we've reached the end of data
-        if not page:
-            break
+    connection = seed.connect_to_prodev()
+    if not connection:
+        return
+    cursor = connection.cursor(dictionary=True)
+    try:
+        last_id = ''
+        while True:
+            # Fetch the current page of results
+            page = paginate_users_after(cursor, page_size, last_id)
             
-        # Yield the current page and update offset for next page
-        yield page
-        offset += page_size
+            # If the page is empty, we've reached the end of data
+            if not page:
+                break
+                
+            # Yield the current page and continue after its last record
+            yield page
+            last_id = page[-1]['user_id']
+    finally:
+        cursor.close()
+        connection.close()
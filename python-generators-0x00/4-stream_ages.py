@@ -3,12 +3,16 @@ import csv
 def stream_user_ages():
     """Generator that yields user ages one by one from user_data.csv."""
     with open('python-generators-0x00/user_data.csv', newline='') as csvfile:
-        reader = csv.DictReader(csvfile)
+        # Plain rows plus the header's age position: no dict is built per row
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if not header or 'age' not in header:
+            return
+        age_index = header.index('age')
         for row in reader:
-            age = row.get('age')
-            if age is not None:
+            if len(row) > age_index:
                 try:
-                    yield int(age)
+                    yield int(row[age_index])
                 except ValueError:
                     continue
 